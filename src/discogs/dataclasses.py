@@ -4,12 +4,17 @@ import math
 import operator
 import re
 from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Any, Literal
 
 from django.db.models import Q
 from django.db.models.functions import Lower
 
-from recordcollection.abstract_classes import AbstractBaseRecord
+from recordcollection.abstract_classes import (
+    AbstractBaseRecord,
+    slotted_dataclass,
+)
+from recordcollection.artist_fields import deferred_artist_fields
 from recordcollection.models import (
     Album,
     AlbumArtist,
@@ -22,6 +27,9 @@ from recordcollection.models import (
 
 current_year = datetime.date.today().year
 
+DISC_TRACK_POSITION = re.compile(r"^(\d+)-(\d+)$")
+SIDE_TRACK_POSITION = re.compile(r"^([A-Z])\d*[a-z]?$")
+
 
 @dataclass
 class DiscogsPagination(AbstractBaseRecord):
@@ -43,7 +51,7 @@ class DiscogsPagination(AbstractBaseRecord):
         return super().serialize_field(key, value)
 
 
-@dataclass
+@slotted_dataclass
 class DiscogsArtist(AbstractBaseRecord):
     anv: str
     id: int
@@ -63,16 +71,16 @@ class DiscogsArtist(AbstractBaseRecord):
         return Artist.iupdate_or_create(name=self.name, discogs_id=self.id)
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class DiscogsFormat(AbstractBaseRecord):
     name: Literal["CD", "Vinyl", "Box Set"]
     qty: str
     descriptions: list[str] = field(default_factory=list)
 
 
-@dataclass
+@slotted_dataclass
 class DiscogsUserRelease(AbstractBaseRecord):
-    @dataclass
+    @slotted_dataclass
     class BasicInformation(AbstractBaseRecord):
         artists: list[DiscogsArtist]
         cover_image: str
@@ -96,7 +104,7 @@ class DiscogsUserRelease(AbstractBaseRecord):
             return super().serialize_field(key, value)
 
     basic_information: BasicInformation
-    date_added: str
+    date_added: datetime.datetime
     id: int
     instance_id: int
     rating: int
@@ -105,6 +113,8 @@ class DiscogsUserRelease(AbstractBaseRecord):
     def serialize_field(cls, key: str, value: Any):
         if key == "basic_information":
             return cls.BasicInformation.from_dict(value)
+        if key == "date_added":
+            return datetime.datetime.fromisoformat(value)
         return super().serialize_field(key, value)
 
 
@@ -121,7 +131,7 @@ class DiscogsUserReleasesResponse(AbstractBaseRecord):
         )
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class DiscogsImage(AbstractBaseRecord):
     height: int
     resource_url: str
@@ -131,13 +141,14 @@ class DiscogsImage(AbstractBaseRecord):
     width: int
 
 
-@dataclass
+@slotted_dataclass
 class DiscogsTrack(AbstractBaseRecord):
     duration: str
     position: str
     title: str
     artists: list[DiscogsArtist] = field(default_factory=list)
     extraartists: list[DiscogsArtist] = field(default_factory=list)
+    type_: Literal["track", "heading", "index"] = "track"
 
     @classmethod
     def serialize_field(cls, key: str, value: Any):
@@ -241,46 +252,61 @@ class DiscogsRelease(AbstractBaseRecord):
             return Album.Medium.VINYL
         return None
 
-    def get_disc_and_track_number(self, track: DiscogsTrack) -> tuple[int, int]:
-        disc_number = 1
-        track_number: int | None = None
-
-        disc_track_match = re.match(r"^(\d+)-(\d+)$", track.position)
-        if disc_track_match:
-            disc_number, track_number = [int(g) for g in disc_track_match.groups()]
-
-        side_track_match = re.match(r"^([A-Z])(\d+)$", track.position)
-        if side_track_match:
-            side_number = ord(side_track_match.group(1)) - 64
-            disc_number = math.ceil(side_number / 2)
-            track_number = int(side_track_match.group(2))
-            if side_number % 2 == 0:
-                previous_side = chr(side_number + 63)
-                previous_side_tracks = [t for t in self.tracklist if t.position.startswith(previous_side)]
-                track_number += len(previous_side_tracks)
-
-        if track_number is None:
-            track_number = self.tracklist.index(track) + 1
-
-        return disc_number, track_number
-
+    @cached_property
+    def track_numbers(self) -> dict[int, tuple[int, int]]:
+        """
+        Tracklist index -> (disc number, track number), computed in one pass.
+        Headings are left out. "1-02" style positions are used as is; vinyl
+        sides ("A1", "B3a", "C") go two to a disc, with tracks numbered
+        consecutively across both sides. Anything else is numbered by its
+        order among the non-heading tracks.
+        """
+        numbers: dict[int, tuple[int, int]] = {}
+        side_track_counts: dict[int, int] = {}
+        track_count = 0
+
+        for idx, track in enumerate(self.tracklist):
+            if track.type_ == "heading":
+                continue
+            track_count += 1
+
+            disc_track_match = DISC_TRACK_POSITION.match(track.position)
+            if disc_track_match:
+                numbers[idx] = (int(disc_track_match.group(1)), int(disc_track_match.group(2)))
+                continue
+
+            side_track_match = SIDE_TRACK_POSITION.match(track.position)
+            if side_track_match:
+                disc_number = math.ceil((ord(side_track_match.group(1)) - 64) / 2)
+                side_track_counts[disc_number] = side_track_counts.get(disc_number, 0) + 1
+                numbers[idx] = (disc_number, side_track_counts[disc_number])
+                continue
+
+            numbers[idx] = (1, track_count)
+
+        return numbers
+
+    @deferred_artist_fields()
     def to_album(self) -> Album:
         is_compilation = self.artists_sort.lower() == "various"
         medium = self.get_medium()
         artist_names = [a.name for a in self.artists]
         genres_and_styles = self.genres + self.styles
 
-        album_qs = Album.objects.filter(title__iexact=self.title)
-        if medium:
-            album_qs = album_qs.filter(medium=medium)
-        if is_compilation:
-            album_qs = album_qs.filter(is_compilation=True)
-        elif artist_names:
-            album_qs = album_qs.filter(
-                functools.reduce(operator.or_, [Q(artists__name__iexact=name) for name in artist_names], Q())
-            )
-
-        album = album_qs.first()
+        # An album already linked to the release, even if renamed since:
+        album = Album.objects.filter(discogs_id=self.id).order_by("pk").first()
+
+        if album is None:
+            album_qs = Album.objects.filter(title__ciexact=self.title)
+            if medium:
+                album_qs = album_qs.filter(medium=medium)
+            if is_compilation:
+                album_qs = album_qs.filter(is_compilation=True)
+            elif artist_names:
+                album_qs = album_qs.filter(
+                    functools.reduce(operator.or_, [Q(artists__name__ciexact=name) for name in artist_names], Q())
+                )
+            album = album_qs.first()
 
         if album:
             album.discogs_id = self.id
@@ -298,9 +324,8 @@ class DiscogsRelease(AbstractBaseRecord):
                 medium=medium,
             )
 
-        for track in self.tracklist:
-            disc_number, track_number = self.get_disc_and_track_number(track)
-            track.to_track(
+        for idx, (disc_number, track_number) in self.track_numbers.items():
+            self.tracklist[idx].to_track(
                 album_id=album.id,
                 disc_number=disc_number,
                 track_number=track_number,
@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 
 from discogs.dataclasses import (
     DiscogsMasterRelease,
@@ -8,17 +9,29 @@ from discogs.dataclasses import (
 from discogs.request import discogs_get
 
 
-def get_user_release_response(page: int, per_page: int = 100) -> DiscogsUserReleasesResponse:
+def get_user_release_response(
+    page: int,
+    per_page: int = 100,
+    sort: Literal["added", "artist", "title", "year"] = "added",
+    sort_order: Literal["asc", "desc"] = "desc",
+) -> DiscogsUserReleasesResponse:
     username = os.environ.get("DISCOGS_USERNAME")
-    url = f"https://api.discogs.com/users/{username}/collection/folders/0/releases?per_page={per_page}&page={page}"
+    url = (
+        f"https://api.discogs.com/users/{username}/collection/folders/0/releases"
+        f"?per_page={per_page}&page={page}&sort={sort}&sort_order={sort_order}"
+    )
     response = discogs_get(url)
     return DiscogsUserReleasesResponse.from_dict(response.json())
 
 
-def get_release(release_id: int) -> DiscogsRelease:
+def get_release_json(release_id: int) -> dict:
     url = f"https://api.discogs.com/releases/{release_id}"
     response = discogs_get(url)
-    return DiscogsRelease.from_dict(response.json())
+    return response.json()
+
+
+def get_release(release_id: int) -> DiscogsRelease:
+    return DiscogsRelease.from_dict(get_release_json(release_id))
 
 
 def get_master_release(master_id: int) -> DiscogsMasterRelease:
@@ -3,58 +3,108 @@ import datetime
 from django.core.management.base import BaseCommand, CommandParser
 
 from discogs.dataclasses import DiscogsUserRelease
-from discogs.functions import get_release, get_user_release_response
+from discogs.functions import get_release_json, get_user_release_response
+from discogs.models import DiscogsReleaseDocument
+from musicbrainz.functions import AlbumUpdateQueue
 from recordcollection.models import Album
+from recordcollection.search import deferred_search_index
+from recordcollection.statistics import deferred_statistics
 from recordcollection.utils import (
     delete_orphan_artists,
+    describe_deletion,
     get_env_datetime,
     import_musicbrainz_genres,
+    iterate_concurrently,
     set_env_datetime,
+    staged_values,
 )
 
 
 class Command(BaseCommand):
+    documents: dict[int, DiscogsReleaseDocument]
     last_sync: datetime.datetime | None
 
     def add_arguments(self, parser: CommandParser):
         parser.add_argument("--delete", action="store_true", help="Delete orphan albums")
         parser.add_argument("--total", action="store_true", help="Total resync, not just add new items")
+        parser.add_argument("--refetch", action="store_true", help="Ignore locally stored release documents")
+        parser.add_argument("--workers", type=int, default=4, help="Number of concurrent release fetches")
 
     def handle(self, *args, **options):
+        self.documents = {}
         self.last_sync = get_env_datetime("LAST_DISCOGS_SYNC")
-        release_ids = list(Album.objects.exclude(discogs_id=None).values_list("discogs_id", flat=True))
+        existing_release_ids = set(
+            Album.objects.filter(discogs_id__isnull=False).order_by().values_list("discogs_id", flat=True)
+        )
+        # Orphan detection needs the whole collection, not just the newest:
+        total = options["total"] is True or options["delete"] is True
 
         import_musicbrainz_genres()
-        user_releases = self.get_user_releases()
+        user_releases = self.get_user_releases(total)
+        release_ids = {r.basic_information.id for r in user_releases}
         if not options["total"]:
-            user_releases = [r for r in user_releases if r.basic_information.id not in release_ids]
+            user_releases = [r for r in user_releases if r.basic_information.id not in existing_release_ids]
 
-        for idx, user_release in enumerate(user_releases):
-            release_ids.append(user_release.basic_information.id)
-            release = get_release(user_release.basic_information.id)
-            album = release.to_album()
-            album = album.update_from_musicbrainz()
-            print(f"[{idx + 1}/{len(user_releases)}] {album}")
+        new_release_ids = list(dict.fromkeys(r.basic_information.id for r in user_releases))
+        if not options["refetch"]:
+            self.documents = DiscogsReleaseDocument.objects.in_bulk(new_release_ids)
 
-        if options["delete"]:
-            orphans = Album.objects.exclude(discogs_id=None).exclude(discogs_id__in=release_ids)
-            if orphans:
-                self.stdout.write(f"Deleting {orphans.count()} orphan albums.")
-                orphans.delete()
+        fetched = iterate_concurrently(self.get_release_document, new_release_ids, max_workers=options["workers"])
 
-        set_env_datetime("LAST_DISCOGS_SYNC")
-        delete_orphan_artists()
+        with deferred_statistics(), deferred_search_index():
+            with AlbumUpdateQueue() as musicbrainz_queue:
+                for idx, (document, is_new) in enumerate(fetched):
+                    if is_new:
+                        document.save()
+                    album = document.to_release().to_album()
+                    musicbrainz_queue.put(album)
+                    print(f"[{idx + 1}/{len(new_release_ids)}] {album}")
 
-    def get_user_releases(self) -> list[DiscogsUserRelease]:
+            if options["delete"]:
+                with staged_values(Album, "discogs_id", release_ids) as discogs_ids:
+                    deleted = Album.objects.filter(discogs_id__isnull=False).exclude(discogs_ids.matches()).delete()[1]
+                if any(deleted.values()):
+                    self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
+
+            set_env_datetime("LAST_DISCOGS_SYNC")
+            deleted = delete_orphan_artists()
+            if any(deleted.values()):
+                self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
+
+    def get_release_document(self, release_id: int) -> tuple[DiscogsReleaseDocument, bool]:
+        """
+        Returns the locally stored document if it's still fresh, otherwise
+        fetches it. Runs in worker threads, so it must not touch the database.
+        """
+        document = self.documents.get(release_id)
+        if document is not None and not document.is_stale:
+            return document, False
+        return DiscogsReleaseDocument.from_json(get_release_json(release_id)), True
+
+    def get_user_releases(self, total: bool = False) -> list[DiscogsUserRelease]:
+        """
+        The collection is fetched newest first, so unless `total` is set, we
+        can stop paging as soon as we reach releases added before last sync.
+        """
         page = 1
         pages: int | None = None
         user_releases = []
 
         while pages is None or page <= pages:
-            self.stdout.write(f"Fetching data ({page}/{pages or '?'}) ...")
-            response = get_user_release_response(page)
+            if total or not self.last_sync:
+                self.stdout.write(f"Fetching data (page {page}/{pages or '?'}) ...")
+            else:
+                self.stdout.write(f"Fetching data (page {page}) ...")
+            response = get_user_release_response(page, sort="added", sort_order="desc")
             pages = response.pagination.pages
             page += 1
             user_releases.extend(response.releases)
+            if (
+                response.releases and
+                not total and
+                self.last_sync and
+                response.releases[-1].date_added < self.last_sync
+            ):
+                break
 
         return user_releases
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DiscogsReleaseDocument',
+            fields=[
+                ('release_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('date_changed', models.DateTimeField(default=None, null=True)),
+                ('fetched', models.DateTimeField()),
+                ('data', models.JSONField()),
+            ],
+        ),
+    ]
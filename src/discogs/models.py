@@ -0,0 +1,44 @@
+import datetime
+
+from django.db import models
+from django.utils import timezone
+
+from discogs.dataclasses import DiscogsRelease
+
+
+class DiscogsReleaseDocument(models.Model):
+    """
+    Raw release JSON as last fetched from Discogs. Releases that haven't been
+    edited upstream in a long time are unlikely to change, so a document is
+    considered fresh for as long as the release had gone unchanged when it was
+    fetched (within MIN_MAX_AGE and MAX_MAX_AGE).
+    """
+    MIN_MAX_AGE = datetime.timedelta(days=1)
+    MAX_MAX_AGE = datetime.timedelta(days=180)
+
+    release_id = models.IntegerField(primary_key=True)
+    date_changed = models.DateTimeField(null=True, default=None)
+    fetched = models.DateTimeField()
+    data = models.JSONField()
+
+    def __str__(self):
+        return str(self.release_id)
+
+    @classmethod
+    def from_json(cls, data: dict) -> "DiscogsReleaseDocument":
+        date_changed: datetime.datetime | None = None
+        try:
+            date_changed = datetime.datetime.fromisoformat(data["date_changed"])
+        except (KeyError, TypeError, ValueError):
+            pass
+        return cls(release_id=data["id"], date_changed=date_changed, fetched=timezone.now(), data=data)
+
+    @property
+    def is_stale(self) -> bool:
+        max_age = self.MIN_MAX_AGE
+        if self.date_changed is not None:
+            max_age = min(max(self.fetched - self.date_changed, self.MIN_MAX_AGE), self.MAX_MAX_AGE)
+        return self.fetched + max_age < timezone.now()
+
+    def to_release(self) -> DiscogsRelease:
+        return DiscogsRelease.from_dict(self.data)
@@ -1,12 +1,39 @@
+import datetime
 from dataclasses import dataclass
 from typing import Any
 
-from recordcollection.abstract_classes import AbstractBaseRecord
+from recordcollection.abstract_classes import (
+    AbstractBaseRecord,
+    slotted_dataclass,
+)
 
 
 @dataclass
+class LastFmPagination(AbstractBaseRecord):
+    user: str
+    total_pages: int
+    page: int
+    total: int
+    per_page: int
+
+    @classmethod
+    def key_to_attr(cls, key: str) -> str:
+        if key == "totalPages":
+            return "total_pages"
+        if key == "perPage":
+            return "per_page"
+        return super().key_to_attr(key)
+
+    @classmethod
+    def serialize_field(cls, key: str, value: Any):
+        if key in ("totalPages", "page", "total", "perPage"):
+            return int(value)
+        return super().serialize_field(key, value)
+
+
+@slotted_dataclass
 class LastFmTopTrack(AbstractBaseRecord):
-    @dataclass
+    @slotted_dataclass
     class Artist(AbstractBaseRecord):
         name: str
         mbid: str | None
@@ -45,30 +72,8 @@ class LastFmTopTrack(AbstractBaseRecord):
 class LastFmTopTracksResponse(AbstractBaseRecord):
     @dataclass
     class TopTracks(AbstractBaseRecord):
-        @dataclass
-        class Attr(AbstractBaseRecord):
-            user: str
-            total_pages: int
-            page: int
-            total: int
-            per_page: int
-
-            @classmethod
-            def key_to_attr(cls, key: str) -> str:
-                if key == "totalPages":
-                    return "total_pages"
-                if key == "perPage":
-                    return "per_page"
-                return super().key_to_attr(key)
-
-            @classmethod
-            def serialize_field(cls, key: str, value: Any):
-                if key in ("totalPages", "page", "total", "perPage"):
-                    return int(value)
-                return super().serialize_field(key, value)
-
         track: list[LastFmTopTrack]
-        attr: Attr
+        attr: LastFmPagination
 
         @classmethod
         def key_to_attr(cls, key: str) -> str:
@@ -81,7 +86,7 @@ class LastFmTopTracksResponse(AbstractBaseRecord):
             if key == "track":
                 return [LastFmTopTrack.from_dict(d) for d in value]
             if key == "@attr":
-                return cls.Attr.from_dict(value)
+                return LastFmPagination.from_dict(value)
             return super().serialize_field(key, value)
 
     toptracks: TopTracks
@@ -91,3 +96,82 @@ class LastFmTopTracksResponse(AbstractBaseRecord):
         if key == "toptracks":
             return cls.TopTracks.from_dict(value)
         return super().serialize_field(key, value)
+
+
+@slotted_dataclass
+class LastFmRecentTrack(AbstractBaseRecord):
+    @slotted_dataclass
+    class Entity(AbstractBaseRecord):
+        text: str
+        mbid: str | None = None
+
+        @classmethod
+        def key_to_attr(cls, key: str) -> str:
+            if key == "#text":
+                return "text"
+            return super().key_to_attr(key)
+
+        @classmethod
+        def serialize_field(cls, key: str, value: Any):
+            if key == "mbid":
+                return value if value else None
+            return super().serialize_field(key, value)
+
+    artist: Entity
+    album: Entity
+    name: str
+    url: str
+    mbid: str | None = None
+    date: datetime.datetime | None = None
+    now_playing: bool = False
+
+    @classmethod
+    def key_to_attr(cls, key: str) -> str:
+        if key == "@attr":
+            return "now_playing"
+        return super().key_to_attr(key)
+
+    @classmethod
+    def serialize_field(cls, key: str, value: Any):
+        if key in ("artist", "album"):
+            return cls.Entity.from_dict(value)
+        if key == "mbid":
+            return value if value else None
+        if key == "date":
+            return datetime.datetime.fromtimestamp(int(value["uts"]), tz=datetime.timezone.utc)
+        if key == "@attr":
+            return value.get("nowplaying") == "true"
+        return super().serialize_field(key, value)
+
+
+@dataclass
+class LastFmRecentTracksResponse(AbstractBaseRecord):
+    @dataclass
+    class RecentTracks(AbstractBaseRecord):
+        track: list[LastFmRecentTrack]
+        attr: LastFmPagination
+
+        @classmethod
+        def key_to_attr(cls, key: str) -> str:
+            if key == "@attr":
+                return "attr"
+            return super().key_to_attr(key)
+
+        @classmethod
+        def serialize_field(cls, key: str, value: Any):
+            if key == "track":
+                # A single track comes as an object rather than a list:
+                if isinstance(value, dict):
+                    value = [value]
+                return [LastFmRecentTrack.from_dict(d) for d in value]
+            if key == "@attr":
+                return LastFmPagination.from_dict(value)
+            return super().serialize_field(key, value)
+
+    recenttracks: RecentTracks
+
+    @classmethod
+    def serialize_field(cls, key: str, value: Any):
+        if key == "recenttracks":
+            return cls.RecentTracks.from_dict(value)
+        return super().serialize_field(key, value)
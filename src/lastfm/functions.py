@@ -1,34 +1,295 @@
-import os
+import contextlib
+import datetime
+import itertools
+from collections import Counter, defaultdict
 from typing import Iterator
-import requests
 
-from lastfm.dataclasses import LastFmTopTrack, LastFmTopTracksResponse
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
 
+from lastfm.dataclasses import (
+    LastFmRecentTrack,
+    LastFmRecentTracksResponse,
+    LastFmTopTrack,
+    LastFmTopTracksResponse,
+)
+from lastfm.models import Scrobble
+from lastfm.request import lastfm_get
+from recordcollection.models import AlbumArtist, Track, TrackArtist
+from recordcollection.statistics import mark_dirty
+from recordcollection.utils import chunked, iterate_concurrently
 
-def get_user_top_tracks() -> LastFmTopTracksResponse:
-    username = os.environ.get("LASTFM_USERNAME")
-    api_key = os.environ.get("LASTFM_API_KEY")
-    url = (
-        "https://ws.audioscrobbler.com/2.0/?method=user.gettoptracks"
-        f"&user={username}&api_key={api_key}&format=json&limit=1000"
-    )
-    response = requests.get(url, timeout=10)
+
+def get_user_top_tracks(page: int = 1, limit: int = 1000) -> LastFmTopTracksResponse:
+    response = lastfm_get("user.gettoptracks", params={"limit": str(limit), "page": str(page)})
     return LastFmTopTracksResponse.from_dict(response.json())
 
 
-def iterate_user_top_tracks() -> Iterator[LastFmTopTrack]:
-    page: int | None = 1
-    username = os.environ.get("LASTFM_USERNAME")
-    api_key = os.environ.get("LASTFM_API_KEY")
-    while page is not None:
-        url = (
-            "https://ws.audioscrobbler.com/2.0/?method=user.gettoptracks"
-            f"&user={username}&api_key={api_key}&format=json&limit=1000&page={page}"
+def iterate_user_top_tracks(min_plays: int | None = None, max_workers: int = 4) -> Iterator[LastFmTopTrack]:
+    """
+    Yields tracks in rank order. The first page tells us the number of pages;
+    the rest are then fetched concurrently. If `min_plays` is set, iteration
+    (and fetching) stops at the first track with fewer plays than that.
+    """
+    first_response = get_user_top_tracks(page=1)
+    other_responses = iterate_concurrently(
+        lambda page: get_user_top_tracks(page=page),
+        range(2, first_response.toptracks.attr.total_pages + 1),
+        max_workers=max_workers,
+        prefetch=max_workers,
+    )
+
+    with contextlib.closing(other_responses):
+        for response in itertools.chain([first_response], other_responses):
+            for track in response.toptracks.track:
+                if min_plays is not None and track.playcount < min_plays:
+                    return
+                yield track
+
+
+def get_user_recent_tracks(
+    page: int = 1,
+    since: datetime.datetime | None = None,
+    until: datetime.datetime | None = None,
+    limit: int = 200,
+) -> LastFmRecentTracksResponse:
+    params = {"limit": str(limit), "page": str(page)}
+    if since:
+        params["from"] = str(int(since.timestamp()) + 1)
+    if until:
+        params["to"] = str(int(until.timestamp()))
+    response = lastfm_get("user.getrecenttracks", params=params)
+    return LastFmRecentTracksResponse.from_dict(response.json())
+
+
+def iterate_user_recent_tracks(
+    since: datetime.datetime | None = None,
+    max_workers: int = 4,
+) -> Iterator[list[LastFmRecentTrack]]:
+    """
+    Yields pages of scrobbles played after `since`, oldest first, so that
+    each page can be saved as it comes without leaving gaps if we're
+    interrupted. Last.fm pages newest first, so the upper bound is fixed to
+    keep page boundaries from shifting while we're at it.
+    """
+    until = timezone.now()
+    first_response = get_user_recent_tracks(page=1, since=since, until=until)
+
+    def get_page(page: int) -> LastFmRecentTracksResponse:
+        if page == 1:
+            return first_response
+        return get_user_recent_tracks(page=page, since=since, until=until)
+
+    responses = iterate_concurrently(
+        get_page,
+        range(first_response.recenttracks.attr.total_pages, 0, -1),
+        max_workers=max_workers,
+        prefetch=max_workers,
+    )
+
+    with contextlib.closing(responses):
+        for response in responses:
+            yield [
+                track for track in reversed(response.recenttracks.track)
+                if not track.now_playing and track.date is not None
+            ]
+
+
+def increment_play_counts(counts: dict[int, int]):
+    """Takes a track id -> number of new plays dict."""
+    track_ids_by_increment: dict[int, list[int]] = defaultdict(list)
+    for track_id, count in counts.items():
+        track_ids_by_increment[count].append(track_id)
+    for increment, track_ids in track_ids_by_increment.items():
+        for chunk in chunked(track_ids, 500):
+            Track.objects.filter(pk__in=chunk).update(play_count=F("play_count") + increment)
+    mark_dirty(track_ids=counts.keys())
+
+
+@transaction.atomic
+def reset_play_counts():
+    """For counting all plays from scratch, from the whole scrobble history."""
+    track_ids = list(Track.objects.exclude(play_count=0).values_list("pk", flat=True))
+    for chunk in chunked(track_ids, 500):
+        Track.objects.filter(pk__in=chunk).update(play_count=0)
+    mark_dirty(track_ids=track_ids)
+
+
+@transaction.atomic
+def save_scrobbles(recent_tracks: list[LastFmRecentTrack], index: "TrackIndex") -> list[Scrobble]:
+    """
+    Saves the scrobbles we don't already have, and adds them to the play
+    counts of their tracks. Returns the saved ones.
+    """
+    scrobbles: dict[tuple[datetime.datetime, str, str], Scrobble] = {}
+    for recent_track in recent_tracks:
+        assert recent_track.date is not None
+        key = (recent_track.date, recent_track.artist.text, recent_track.name)
+        scrobbles.setdefault(key, Scrobble(
+            played_at=recent_track.date,
+            artist_name=recent_track.artist.text,
+            title=recent_track.name,
+            album_title=recent_track.album.text,
+            name_hash=Scrobble.get_name_hash(recent_track.artist.text, recent_track.name),
+            musicbrainz_id=recent_track.mbid,
+            track_id=index.match_scrobble(
+                title=recent_track.name,
+                artist_name=recent_track.artist.text,
+                album_title=recent_track.album.text,
+                musicbrainz_id=recent_track.mbid,
+                artist_musicbrainz_id=recent_track.artist.mbid,
+            ),
+        ))
+    if not scrobbles:
+        return []
+
+    # Pages can overlap at the `since` boundary:
+    dates = [key[0] for key in scrobbles]
+    for key in (
+        Scrobble.objects
+        .filter(played_at__range=(min(dates), max(dates)))
+        .values_list("played_at", "artist_name", "title")
+    ):
+        scrobbles.pop(key, None)
+
+    new_scrobbles = list(scrobbles.values())
+    Scrobble.objects.bulk_create(new_scrobbles, ignore_conflicts=True)
+    increment_play_counts(Counter(scrobble.track_id for scrobble in new_scrobbles if scrobble.track_id))
+    return new_scrobbles
+
+
+@transaction.atomic
+def rematch_scrobbles(index: "TrackIndex") -> int:
+    """Tries to match previously unmatched scrobbles. Returns match count."""
+    matched: list[Scrobble] = []
+
+    for scrobble in Scrobble.objects.filter(track=None).iterator():
+        scrobble.track_id = index.match_scrobble(
+            title=scrobble.title,
+            artist_name=scrobble.artist_name,
+            album_title=scrobble.album_title,
+            musicbrainz_id=scrobble.musicbrainz_id,
+        )
+        if scrobble.track_id:
+            matched.append(scrobble)
+
+    Scrobble.objects.bulk_update(matched, fields=["track"], batch_size=500)
+    increment_play_counts(Counter(scrobble.track_id for scrobble in matched))
+    return len(matched)
+
+
+def normalize(value: str) -> str:
+    return value.strip().casefold()
+
+
+class TrackIndex:
+    """
+    In-memory lookup tables for matching Last.fm tracks against the whole
+    collection, which is loaded with a handful of queries. A track is
+    considered to be by an artist if the artist is credited on either the
+    track or its album.
+    """
+    def __init__(self):
+        self.by_mbid: dict[str, set[int]] = defaultdict(set)
+        self.by_artist_mbid: dict[tuple[str, str], set[int]] = defaultdict(set)
+        self.by_artist_name: dict[tuple[str, str], set[int]] = defaultdict(set)
+        self.musicbrainz_ids: dict[int, str | None] = {}
+        self.album_titles: dict[int, str] = {}
+
+    @classmethod
+    def build(cls) -> "TrackIndex":
+        index = cls()
+        track_artists: dict[int, list[tuple[str, str | None]]] = defaultdict(list)
+        album_artists: dict[int, list[tuple[str, str | None]]] = defaultdict(list)
+
+        for track_id, name, musicbrainz_id in TrackArtist.objects.values_list(
+            "track_id", "artist__name", "artist__musicbrainz_id"
+        ):
+            track_artists[track_id].append((name, musicbrainz_id))
+        for album_id, name, musicbrainz_id in AlbumArtist.objects.values_list(
+            "album_id", "artist__name", "artist__musicbrainz_id"
+        ):
+            album_artists[album_id].append((name, musicbrainz_id))
+
+        for track_id, title, musicbrainz_id, album_id, album_title in Track.objects.values_list(
+            "id", "title", "musicbrainz_id", "album_id", "album__title"
+        ):
+            index.add(
+                track_id=track_id,
+                title=title,
+                musicbrainz_id=musicbrainz_id,
+                artists=track_artists.get(track_id, []) + album_artists.get(album_id, []),
+                album_title=album_title,
+            )
+
+        return index
+
+    def add(
+        self,
+        track_id: int,
+        title: str,
+        musicbrainz_id: str | None,
+        artists: list[tuple[str, str | None]],
+        album_title: str | None = None,
+    ):
+        title = normalize(title)
+        self.musicbrainz_ids[track_id] = musicbrainz_id
+        if album_title:
+            self.album_titles[track_id] = normalize(album_title)
+        if musicbrainz_id:
+            self.by_mbid[musicbrainz_id].add(track_id)
+        for artist_name, artist_musicbrainz_id in artists:
+            self.by_artist_name[(normalize(artist_name), title)].add(track_id)
+            if artist_musicbrainz_id:
+                self.by_artist_mbid[(artist_musicbrainz_id, title)].add(track_id)
+
+    def match(
+        self,
+        title: str,
+        artist_name: str,
+        musicbrainz_id: str | None = None,
+        artist_musicbrainz_id: str | None = None,
+    ) -> set[int]:
+        """
+        Tries, in order: track MBID, artist MBID + title, artist name + title.
+        Returns the ids of all tracks matched by the first that succeeds.
+        """
+        title = normalize(title)
+        if musicbrainz_id and musicbrainz_id in self.by_mbid:
+            return self.by_mbid[musicbrainz_id]
+        if artist_musicbrainz_id and (artist_musicbrainz_id, title) in self.by_artist_mbid:
+            return self.by_artist_mbid[(artist_musicbrainz_id, title)]
+        return self.by_artist_name.get((normalize(artist_name), title), set())
+
+    def match_lastfm_track(self, lastfm_track: LastFmTopTrack) -> set[int]:
+        return self.match(
+            title=lastfm_track.name,
+            artist_name=lastfm_track.artist.name,
+            musicbrainz_id=lastfm_track.mbid,
+            artist_musicbrainz_id=lastfm_track.artist.mbid,
+        )
+
+    def match_scrobble(
+        self,
+        title: str,
+        artist_name: str,
+        album_title: str,
+        musicbrainz_id: str | None = None,
+        artist_musicbrainz_id: str | None = None,
+    ) -> int | None:
+        """
+        A single play should only count for a single track, so if several
+        match, prefer one from the same album.
+        """
+        track_ids = self.match(
+            title=title,
+            artist_name=artist_name,
+            musicbrainz_id=musicbrainz_id,
+            artist_musicbrainz_id=artist_musicbrainz_id,
         )
-        response = LastFmTopTracksResponse.from_dict(requests.get(url, timeout=10).json())
-        for track in response.toptracks.track:
-            yield track
-        if response.toptracks.attr.total_pages > page:
-            page += 1
-        else:
-            page = None
+        if not track_ids:
+            return None
+        album_title = normalize(album_title)
+        same_album_ids = [track_id for track_id in track_ids if self.album_titles.get(track_id) == album_title]
+        return min(same_album_ids or track_ids)
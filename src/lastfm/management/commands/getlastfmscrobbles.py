@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Max
+
+from lastfm.functions import (
+    TrackIndex,
+    iterate_user_recent_tracks,
+    rematch_scrobbles,
+    reset_play_counts,
+    save_scrobbles,
+)
+from lastfm.models import Scrobble
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches scrobbles played since the last one we have and adds them to Track.play_count. On the first run, "
+        "play counts (e.g. from getlastfmtoptracks) are reset and counted from the whole scrobble history."
+    )
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--rematch", action="store_true", help="Retry matching previously unmatched scrobbles")
+        parser.add_argument("--workers", type=int, default=4, help="Number of concurrent page fetches")
+
+    def handle(self, *args, **options):
+        since = Scrobble.objects.aggregate(last=Max("played_at"))["last"]
+        index = TrackIndex.build()
+
+        if since is None:
+            # Otherwise, the plays already counted would be counted again:
+            self.stdout.write("No scrobbles stored yet; resetting play counts.")
+            reset_play_counts()
+
+        if options["rematch"]:
+            self.stdout.write(f"Matched {rematch_scrobbles(index)} previously unmatched scrobbles.")
+
+        for recent_tracks in iterate_user_recent_tracks(since=since, max_workers=options["workers"]):
+            scrobbles = save_scrobbles(recent_tracks, index)
+            if scrobbles:
+                matched = len([scrobble for scrobble in scrobbles if scrobble.track_id])
+                self.stdout.write(
+                    f"Saved {len(scrobbles)} scrobbles up to {scrobbles[-1].played_at} ({matched} matched)"
+                )
@@ -1,36 +1,32 @@
-from django.core.management.base import BaseCommand
-from django.db.models import Q
+from django.core.management.base import BaseCommand, CommandParser
 
-from lastfm.functions import iterate_user_top_tracks
+from lastfm.functions import TrackIndex, iterate_user_top_tracks
 from recordcollection.models import Track
+from recordcollection.statistics import mark_dirty
 
 
 class Command(BaseCommand):
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--min-plays", type=int, help="Ignore tracks with fewer plays than this")
+        parser.add_argument("--workers", type=int, default=4, help="Number of concurrent page fetches")
+
     def handle(self, *args, **options):
-        for lastfm_track in iterate_user_top_tracks():
-            track_qs = Track.objects.none()
-            if lastfm_track.mbid:
-                track_qs = Track.objects.filter(musicbrainz_id=lastfm_track.mbid)
-            if track_qs.count() == 0 and lastfm_track.artist.mbid:
-                track_qs = Track.objects.filter(
-                    Q(artists__musicbrainz_id=lastfm_track.artist.mbid) |
-                    Q(album__artists__musicbrainz_id=lastfm_track.artist.mbid),
-                    title__iexact=lastfm_track.name,
-                )
-            if track_qs.count() == 0:
-                track_qs = Track.objects.filter(
-                    Q(artists__name__iexact=lastfm_track.artist.name) |
-                    Q(album__artists__name__iexact=lastfm_track.artist.name),
-                    title__iexact=lastfm_track.name,
-                )
-            tracks = list(track_qs)
-            if len(tracks) > 0:
-                for track in tracks:
-                    track.play_count = lastfm_track.playcount
-                    if lastfm_track.mbid:
-                        track.musicbrainz_id = lastfm_track.mbid
+        index = TrackIndex.build()
+        updated_tracks: dict[int, Track] = {}
+
+        for lastfm_track in iterate_user_top_tracks(min_plays=options["min_plays"], max_workers=options["workers"]):
+            track_ids = index.match_lastfm_track(lastfm_track)
+            if track_ids:
+                for track_id in track_ids:
+                    updated_tracks[track_id] = Track(
+                        id=track_id,
+                        play_count=lastfm_track.playcount,
+                        musicbrainz_id=lastfm_track.mbid or index.musicbrainz_ids[track_id],
+                    )
                 self.stdout.write(
                     f"{lastfm_track.artist.name} - {lastfm_track.name}: "
-                    f"updating {len(tracks)} tracks ({lastfm_track.playcount} plays)"
+                    f"updating {len(track_ids)} tracks ({lastfm_track.playcount} plays)"
                 )
-                Track.objects.bulk_update(tracks, fields=["play_count", "musicbrainz_id"])
+
+        Track.objects.bulk_update(updated_tracks.values(), fields=["play_count", "musicbrainz_id"], batch_size=500)
+        mark_dirty(track_ids=updated_tracks.keys())
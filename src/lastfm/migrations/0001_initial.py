@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('recordcollection', '0007_track_play_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Scrobble',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('played_at', models.DateTimeField(db_index=True)),
+                ('artist_name', models.CharField(max_length=500)),
+                ('title', models.CharField(max_length=500)),
+                ('album_title', models.CharField(blank=True, default='', max_length=500)),
+                ('name_hash', models.CharField(editable=False, max_length=40)),
+                ('musicbrainz_id', models.CharField(blank=True, default=None, max_length=200, null=True)),
+                ('track', models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scrobbles', to='recordcollection.track')),
+            ],
+            options={
+                'ordering': ['-played_at'],
+                'constraints': [models.UniqueConstraint(fields=('played_at', 'name_hash'), name='unique_scrobble')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+import hashlib
+
+from django.db import models
+
+
+class Scrobble(models.Model):
+    """
+    Append-only play history, as ingested from Last.fm. `track` is the local
+    track the play was matched to, if any.
+    """
+    played_at = models.DateTimeField(db_index=True)
+    artist_name = models.CharField(max_length=500)
+    title = models.CharField(max_length=500)
+    album_title = models.CharField(max_length=500, blank=True, default="")
+    # Stands in for artist_name and title in the unique constraint, as they
+    # are too long for a MySQL index together:
+    name_hash = models.CharField(max_length=40, editable=False)
+    musicbrainz_id = models.CharField(max_length=200, null=True, default=None, blank=True)
+    track = models.ForeignKey(
+        "recordcollection.Track",
+        on_delete=models.SET_NULL,
+        null=True,
+        default=None,
+        related_name="scrobbles",
+    )
+
+    class Meta:
+        ordering = ["-played_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["played_at", "name_hash"], name="unique_scrobble"),
+        ]
+
+    def __str__(self):
+        return f"{self.artist_name} - {self.title} ({self.played_at})"
+
+    @staticmethod
+    def get_name_hash(artist_name: str, title: str) -> str:
+        return hashlib.sha1(f"{artist_name}\0{title}".encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.name_hash = self.get_name_hash(self.artist_name, self.title)
+        super().save(*args, **kwargs)
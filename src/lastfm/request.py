@@ -0,0 +1,21 @@
+import os
+
+import requests
+
+from recordcollection.utils import get_user_agent
+
+
+def lastfm_get(method: str, params: dict[str, str] | None = None) -> requests.Response:
+    params = {
+        "method": method,
+        "user": os.environ.get("LASTFM_USERNAME", ""),
+        "api_key": os.environ.get("LASTFM_API_KEY", ""),
+        "format": "json",
+        **(params or {}),
+    }
+    return requests.get(
+        "https://ws.audioscrobbler.com/2.0/",
+        params=params,
+        headers={"User-Agent": get_user_agent()},
+        timeout=10,
+    )
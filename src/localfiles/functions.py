@@ -60,7 +60,7 @@ def tinytag_to_track(file: Path, tag: TinyTag, file_idx: int, album_id: int | No
         artist = Artist.iupdate_or_create(name=artist_name)
         TrackArtist.objects.update_or_create(track=track, artist=artist)
     if tag.genre:
-        genre = Genre.objects.filter(name__iexact=tag.genre).first()
+        genre = Genre.objects.filter(name__ciexact=tag.genre).first()
         if genre:
             track.genres.add(genre)
 
@@ -97,15 +97,15 @@ def scan_audio_files(
                 album = track_albums[0]
 
             if album is None:
-                track_album_qs = Album.objects.filter(title__iexact=tag.album, medium=Album.Medium.FILE)
+                track_album_qs = Album.objects.filter(title__ciexact=tag.album, medium=Album.Medium.FILE)
                 if is_compilation:
                     track_album_qs = track_album_qs.filter(is_compilation=True)
                 else:
                     artist_filter = Q()
                     if tag.albumartist:
-                        artist_filter = Q(artists__name__iexact=tag.albumartist)
+                        artist_filter = Q(artists__name__ciexact=tag.albumartist)
                     if tag.artist:
-                        artist_filter = artist_filter | Q(artists__name__iexact=tag.artist)
+                        artist_filter = artist_filter | Q(artists__name__ciexact=tag.artist)
                     track_album_qs = track_album_qs.filter(artist_filter)
                 album = track_album_qs.first()
 
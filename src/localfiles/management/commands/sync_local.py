@@ -1,4 +1,5 @@
 import datetime
+from collections import Counter
 from glob import glob
 from pathlib import Path
 
@@ -6,10 +7,14 @@ from django.core.management.base import BaseCommand, CommandParser
 
 from localfiles.functions import scan_directory_recursive
 from recordcollection.models import Album, Track
+from recordcollection.search import deferred_search_index
+from recordcollection.statistics import deferred_statistics
 from recordcollection.utils import (
+    describe_deletion,
     get_env_datetime,
     import_musicbrainz_genres,
     set_env_datetime,
+    staged_values,
 )
 
 
@@ -32,26 +37,28 @@ class Command(BaseCommand):
 
         import_musicbrainz_genres()
 
-        for root in paths:
-            file_paths.update(
-                scan_directory_recursive(
-                    directory=root,
-                    exceptions=exceptions,
-                    existing_file_paths=existing_file_paths,
-                    is_compilation=options["various"],
-                    total=options["total"],
+        with deferred_statistics(), deferred_search_index():
+            for root in paths:
+                file_paths.update(
+                    scan_directory_recursive(
+                        directory=root,
+                        exceptions=exceptions,
+                        existing_file_paths=existing_file_paths,
+                        is_compilation=options["various"],
+                        total=options["total"],
+                    )
                 )
-            )
-
-        if options["delete"]:
-            orphan_tracks = Track.objects.exclude(file_path=None).exclude(file_path__in=file_paths)
-            if orphan_tracks:
-                album_ids = [track.album_id for track in orphan_tracks if track.album_id is not None]
-                self.stdout.write(f"Deleting {orphan_tracks.count()} orphan tracks.")
-                orphan_tracks.delete()
-                orphan_albums = Album.objects.filter(pk__in=album_ids, tracks=None)
-                if orphan_albums:
-                    self.stdout.write(f"Deleting {orphan_albums.count()} orphan albums.")
-                    orphan_albums.delete()
+
+            if options["delete"]:
+                with staged_values(Track, "file_path", file_paths) as staged_paths:
+                    orphan_tracks = Track.objects.filter(file_path__isnull=False).exclude(staged_paths.matches())
+                    # Their albums, to delete those that end up empty:
+                    with staged_values(
+                        Album, "id", orphan_tracks.filter(album__isnull=False).order_by().values_list("album_id")
+                    ) as album_ids:
+                        deleted = Counter(orphan_tracks.delete()[1])
+                        deleted.update(Album.objects.filter(album_ids.matches(), tracks=None).delete()[1])
+                if any(deleted.values()):
+                    self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
 
         set_env_datetime("LAST_LOCALFILES_SYNC")
@@ -7,7 +7,10 @@ import Levenshtein
 from django.db import transaction
 from django.db.models.functions import Lower
 
-from recordcollection.abstract_classes import AbstractBaseRecord
+from recordcollection.abstract_classes import (
+    AbstractBaseRecord,
+    slotted_dataclass,
+)
 from recordcollection.models import (
     Album,
     AlbumArtist,
@@ -26,9 +29,9 @@ def date_to_year(date: str | None) -> int | None:
     return None
 
 
-@dataclass
+@slotted_dataclass
 class MusicBrainzArtistCredit(AbstractBaseRecord):
-    @dataclass
+    @slotted_dataclass
     class MusicBrainzArtist(AbstractBaseRecord):
         id: str
         name: str
@@ -77,15 +80,15 @@ class MusicBrainzArtistCreditList(list[MusicBrainzArtistCredit]):
         return sum(ratios, start=0.0) / len(ratios) if len(ratios) > 0 else 0.0
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class MusicBrainzGenre(AbstractBaseRecord):
     id: str
     name: str
 
 
-@dataclass
+@slotted_dataclass
 class MusicBrainzTrack(AbstractBaseRecord):
-    @dataclass
+    @slotted_dataclass
     class Recording(AbstractBaseRecord):
         genres: list[MusicBrainzGenre]
         first_release_date: str | None = None
@@ -131,9 +134,9 @@ class MusicBrainzTrack(AbstractBaseRecord):
         return result / 2
 
 
-@dataclass
+@slotted_dataclass
 class MusicBrainzRelease(AbstractBaseRecord):
-    @dataclass
+    @slotted_dataclass
     class ReleaseGroup(AbstractBaseRecord):
         artist_credit: MusicBrainzArtistCreditList
         id: str
@@ -149,7 +152,7 @@ class MusicBrainzRelease(AbstractBaseRecord):
                 return [MusicBrainzGenre.from_dict(d) for d in value]
             return super().serialize_field(key, value)
 
-    @dataclass
+    @slotted_dataclass
     class Media(AbstractBaseRecord):
         position: int
         track_count: int
@@ -162,7 +165,7 @@ class MusicBrainzRelease(AbstractBaseRecord):
                 return [MusicBrainzTrack.from_dict(d) for d in value]
             return super().serialize_field(key, value)
 
-    @dataclass
+    @slotted_dataclass
     class ReleaseTrack(MusicBrainzTrack):
         disc_number: int
 
@@ -304,7 +307,7 @@ class MusicBrainzRelease(AbstractBaseRecord):
 class MusicBrainzReleaseSearch(AbstractBaseRecord):
     @dataclass
     class Release(AbstractBaseRecord):
-        @dataclass
+        @slotted_dataclass
         class ReleaseGroup(AbstractBaseRecord):
             title: str
             id: str
@@ -1,12 +1,18 @@
+import queue
+import threading
 import time
+from typing import Callable
 from urllib.parse import quote
 
 import requests
+from django.db import connections
+from django.db.models import prefetch_related_objects
 
 from musicbrainz.dataclasses import (
     MusicBrainzRelease,
     MusicBrainzReleaseSearch,
 )
+from recordcollection.artist_fields import flush_artist_fields
 from recordcollection.models import Album
 from recordcollection.utils import get_user_agent
 
@@ -67,3 +73,59 @@ def get_musicbrainz_album_matches(album: Album) -> list[MusicBrainzRelease.Album
 def get_best_musicbrainz_album_match(album: Album) -> MusicBrainzRelease.AlbumMatch | None:
     matches = get_musicbrainz_album_matches(album=album)
     return matches[0] if matches else None
+
+
+class AlbumUpdateQueue:
+    """
+    Does the rate limited MusicBrainz lookups for albums in a background
+    thread, so they don't hold up whatever is feeding the
+    queue. The matches are applied in the feeding thread, on put() and when
+    leaving the context, so that all database writes happen there: within
+    its transactions and deferred refreshes, and without competing with it
+    for SQLite's write lock. Use as a context manager; leaving it waits for
+    the queue to drain.
+    """
+    def __init__(self, callback: Callable[[Album], None] | None = None):
+        self.callback = callback
+        self.queue: queue.Queue[Album | None] = queue.Queue()
+        self.results: queue.Queue[tuple[Album, MusicBrainzRelease.AlbumMatch | None]] = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def __enter__(self) -> "AlbumUpdateQueue":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.queue.put(None)
+        self.thread.join()
+        self.apply_results()
+
+    def put(self, album: Album):
+        # What the matching reads, so the lookups don't query the database,
+        # and get up to date artist strings:
+        flush_artist_fields()
+        prefetch_related_objects([album], "tracks__artists", "artists")
+        self.queue.put(album)
+        self.apply_results()
+
+    def apply_results(self):
+        while True:
+            try:
+                album, match = self.results.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                album = album.apply_musicbrainz_match(match)
+            except Exception as e:
+                print(f"Error for album ID={album.id}: {e}")
+                continue
+            if self.callback:
+                self.callback(album)
+
+    def run(self):
+        try:
+            while (album := self.queue.get()) is not None:
+                self.results.put((album, get_best_musicbrainz_album_match(album)))
+        finally:
+            # Only closes connections opened by this thread.
+            connections.close_all()
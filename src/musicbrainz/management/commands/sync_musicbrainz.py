@@ -4,6 +4,7 @@ from musicbrainz.functions import get_best_musicbrainz_album_match
 from recordcollection.models import Album
 from recordcollection.utils import (
     delete_orphan_artists,
+    describe_deletion,
     import_musicbrainz_genres,
 )
 
@@ -35,4 +36,6 @@ class Command(BaseCommand):
                 album.musicbrainz_id = ""
                 album.save(update_fields=["musicbrainz_id"])
 
-        delete_orphan_artists()
+        deleted = delete_orphan_artists()
+        if any(deleted.values()):
+            self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
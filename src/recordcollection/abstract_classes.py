@@ -1,21 +1,80 @@
+import sys
 from abc import ABC
 from dataclasses import dataclass, fields
-from typing import Any
+from typing import Any, Callable, ClassVar, TypeVar, overload
+
+
+if sys.version_info >= (3, 11):
+    from typing import dataclass_transform
+else:
+    def dataclass_transform(**kwargs):
+        return lambda func: func
+
+
+_T = TypeVar("_T", bound=type)
+
+
+class RecordDecoder:
+    """
+    What from_dict needs to know about a record class, worked out once per
+    class: its field names, which JSON keys map to which of them (memoized
+    as keys are encountered, since key_to_attr may be overridden), and
+    whether serialize_field needs to be called at all.
+    """
+    class KeyMap(dict[str, str | None]):
+        def __init__(self, decoder: "RecordDecoder"):
+            super().__init__()
+            self.decoder = decoder
+
+        def __missing__(self, key: str) -> str | None:
+            attr = self.decoder.cls.key_to_attr(key)
+            self[key] = attr if attr in self.decoder.init_field_names else None
+            return self[key]
+
+    def __init__(self, cls: type["AbstractBaseRecord"]):
+        self.cls = cls
+        self.field_names = tuple(f.name for f in fields(cls))
+        self.init_field_names = frozenset(f.name for f in fields(cls) if f.init)
+        self.attrs = self.KeyMap(self)
+        self.serialize_field = (
+            cls.serialize_field
+            if getattr(cls.serialize_field, "__func__", None) is not AbstractBaseRecord.serialize_field.__func__
+            else None
+        )
+
+    def decode(self, d: dict):
+        attrs = self.attrs
+        serialize_field = self.serialize_field
+        kwargs = {}
+
+        for key, value in d.items():
+            attr = attrs[key]
+            if attr is not None:
+                kwargs[attr] = serialize_field(key, value) if serialize_field else value
+
+        return self.cls(**kwargs)
 
 
-@dataclass
 class AbstractBaseRecord(ABC):
+    # Not a dataclass itself, so that subclasses can be frozen, and without
+    # __dict__, so that slotted_dataclass subclasses actually get rid of it:
+    __slots__ = ()
+
+    _decoder: ClassVar[RecordDecoder]
+
+    @classmethod
+    def get_decoder(cls) -> RecordDecoder:
+        # Looked up in the class' own __dict__, as subclasses need their own:
+        decoder = cls.__dict__.get("_decoder")
+        if decoder is None:
+            decoder = RecordDecoder(cls)
+            cls._decoder = decoder
+        return decoder
+
     @classmethod
     def from_dict(cls, d: dict):
         try:
-            field_names = [f.name for f in fields(cls)]
-            return cls(
-                **{
-                    cls.key_to_attr(k): cls.serialize_field(k, v)
-                    for k, v in d.items()
-                    if cls.key_to_attr(k) in field_names
-                }
-            )
+            return cls.get_decoder().decode(d)
         except Exception as e:
             print(d)
             raise e
@@ -31,5 +90,44 @@ class AbstractBaseRecord(ABC):
         return value
 
     def to_dict(self) -> dict[str, Any]:
-        field_names = [f.name for f in fields(self)]
-        return {f: getattr(self, f) for f in field_names}
+        return {f: getattr(self, f) for f in self.get_decoder().field_names}
+
+
+@overload
+def slotted_dataclass(cls: _T, /) -> _T:
+    ...
+
+
+@overload
+def slotted_dataclass(cls: None = None, /, *, frozen: bool = False) -> Callable[[_T], _T]:
+    ...
+
+
+@dataclass_transform()
+def slotted_dataclass(cls=None, /, *, frozen=False):
+    """
+    Like @dataclass(slots=True), for records that are kept in memory in bulk.
+    The class can't have a cached_property, and its parents must also be
+    slotted for it to make a difference.
+
+    slots=True creates a new class, which before Python 3.14 breaks zero
+    argument super() in the methods of the old one (they reference it in a
+    __class__ closure cell). Those cells are pointed to the new class here.
+    """
+    def wrap(cls):
+        slotted_cls = dataclass(cls, slots=True, frozen=frozen)
+
+        for value in slotted_cls.__dict__.values():
+            value = getattr(value, "__func__", value)
+            functions = [value.fget, value.fset, value.fdel] if isinstance(value, property) else [value]
+            for function in functions:
+                for cell in getattr(function, "__closure__", None) or ():
+                    try:
+                        if cell.cell_contents is cls:
+                            cell.cell_contents = slotted_cls
+                    except ValueError:
+                        pass
+
+        return slotted_cls
+
+    return wrap if cls is None else wrap(cls)
@@ -1,10 +1,8 @@
-import functools
-import operator
 import re
 
 from django.contrib import admin
-from django.db.models import CharField, Count, OuterRef, Q, Subquery, Sum
-from django.db.models.functions import Concat, Lower
+from django.db.models import CharField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Concat, Lower
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 from django.urls import reverse
@@ -12,12 +10,16 @@ from django.utils.html import format_html
 from django.utils.text import smart_split, unescape_string_literal
 
 from recordcollection.admin_filters import (
+    AlbumArtistFilter,
     AlbumCountFilter,
     AlbumGenreFilter,
     HasMusicBrainzIDFilter,
+    TrackArtistFilter,
     TrackDurationFilter,
     TrackGenreFilter,
 )
+from recordcollection.admin_mixins import SubquerySearchMixin
+from recordcollection.admin_paginators import EstimatedCountPaginator
 from recordcollection.models import (
     Album,
     AlbumArtist,
@@ -26,6 +28,10 @@ from recordcollection.models import (
     Track,
     TrackArtist,
 )
+from recordcollection.search import DOCUMENT_FIELDS, search_tracks
+
+
+SEARCH_PREFIX_FIELDS = {"title": ["title"], "album": ["album"], "artist": ["artists"]}
 
 
 def artist_link_list(artists: list[Artist]):
@@ -62,11 +68,7 @@ class AlbumTrackInline(admin.TabularInline):
     show_change_link = True
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Track]:
-        return (
-            super().get_queryset(request)
-            .order_by("disc_number", "track_number")
-            .prefetch_related("track_artists__artist")
-        )
+        return super().get_queryset(request).order_by("disc_number", "track_number")
 
 
 class ArtistAlbumInline(admin.TabularInline):
@@ -90,9 +92,11 @@ class TrackArtistInline(admin.TabularInline):
 
 # MODEL ADMINS ################################################################
 
-class AbstractBaseAdmin(admin.ModelAdmin):
+class AbstractBaseAdmin(SubquerySearchMixin, admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
     readonly_fields = ("musicbrainz_id", "spotify_id", "discogs_id")
     save_on_top = True
+    show_full_result_count = False
 
     class Media:
         css = {"all": ["admin.css"]}
@@ -120,7 +124,8 @@ class AlbumAdmin(AbstractBaseAdmin):
         "is_compilation",
         "medium",
         HasMusicBrainzIDFilter,
-        ("genres", AlbumGenreFilter),
+        AlbumGenreFilter,
+        AlbumArtistFilter,
     ]
     readonly_fields = ("musicbrainz_id", "musicbrainz_group_id", "spotify_id", "discogs_id")
     search_fields = ["title", "artists__name", "year", "genres__name"]
@@ -135,16 +140,13 @@ class AlbumAdmin(AbstractBaseAdmin):
             super().get_queryset(request)
             .prefetch_related("album_artists__artist", "genres")
             .annotate(
-                track_count=Count("tracks", distinct=True),
-                artist_order=Subquery(
-                    AlbumArtist.objects.filter(album=OuterRef("pk")).values(name=Lower("artist__name"))[:1],
-                ),
-                play_count=Sum("tracks__play_count"),
+                track_count=Coalesce("statistics__track_count", 0),
+                play_count=Coalesce("statistics__play_count", 0),
             )
-            .order_by("artist_order", "year")
+            .order_by("artist_sort", "year")
         )
 
-    @admin.display(ordering=Concat("is_compilation", "artist_order", output_field=CharField()), description="artists")
+    @admin.display(ordering=Concat("is_compilation", "artist_sort", output_field=CharField()), description="artists")
     def artist_list(self, obj: Album):
         return artist_link_list([a.artist for a in obj.album_artists.all()])
 
@@ -184,16 +186,16 @@ class ArtistAdmin(AbstractBaseAdmin):
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Artist]:
         return super().get_queryset(request).annotate(
-            album_count=Count("albums", distinct=True),
-            track_count=Count("tracks", distinct=True),
-            play_count=Sum("albums__tracks__play_count", distinct=True),
+            album_count=Coalesce("statistics__album_count", 0),
+            track_count=Coalesce("statistics__track_count", 0),
+            play_count=Coalesce("statistics__play_count", 0),
         )
 
     @admin.display(ordering="album_count", description="# albums")
     def album_count(self, obj):
         if obj.album_count > 0:
             return format_html(
-                '<a href="{}?artists__id__exact={}">{}</a>',
+                '<a href="{}?artist={}">{}</a>',
                 reverse("admin:recordcollection_album_changelist"),
                 obj.pk,
                 obj.album_count,
@@ -208,7 +210,7 @@ class ArtistAdmin(AbstractBaseAdmin):
     def track_count(self, obj):
         if obj.track_count > 0:
             return format_html(
-                '<a href="{}?artists__id__exact={}">{}</a>',
+                '<a href="{}?artist={}">{}</a>',
                 reverse("admin:recordcollection_track_changelist"),
                 obj.pk,
                 obj.track_count,
@@ -241,17 +243,11 @@ class TrackAdmin(AbstractBaseAdmin):
     list_filter = [
         HasMusicBrainzIDFilter,
         TrackDurationFilter,
-        ("genres", TrackGenreFilter),
-    ]
-    search_fields = [
-        "album__artists__name",
-        "album__title",
-        "album__year",
-        "artists__name",
-        "genres__name",
-        "title",
-        "year",
+        TrackGenreFilter,
+        TrackArtistFilter,
     ]
+    # Only here to get a search box; see get_search_results():
+    search_fields = ["title"]
     search_help_text = "Prefix search with \"title:\", \"album:\", or \"artist:\" to only search specific fields."
 
     def get_queryset(self, request: HttpRequest) -> QuerySet[Track]:
@@ -260,9 +256,6 @@ class TrackAdmin(AbstractBaseAdmin):
             .select_related("album")
             .prefetch_related("track_artists__artist", "genres")
             .annotate(
-                artist_order=Subquery(
-                    TrackArtist.objects.filter(track=OuterRef("pk")).values(name=Lower("artist__name"))[:1],
-                ),
                 genre_order=Subquery(
                     Genre.objects.filter(tracks=OuterRef("pk")).values(iname=Lower("name"))[:1],
                 )
@@ -270,31 +263,19 @@ class TrackAdmin(AbstractBaseAdmin):
         )
 
     def get_search_results(self, request, queryset, search_term):
-        lookups: list[str] = []
-        regex: re.Pattern | None = None
-
-        if search_term.lower().startswith("title:"):
-            regex = re.compile(r"^title: *(.*)$", flags=re.IGNORECASE)
-            lookups = ["title__icontains"]
-        elif search_term.lower().startswith("album:"):
-            regex = re.compile(r"^album: *(.*)$", flags=re.IGNORECASE)
-            lookups = ["album__title__icontains"]
-        elif search_term.lower().startswith("artist:"):
-            regex = re.compile(r"^artist: *(.*)$", flags=re.IGNORECASE)
-            lookups = ["album__artists__name__icontains", "artists__name__icontains"]
-
-        if regex and lookups:
-            term_queries = []
-            search_term = regex.sub(r"\1", search_term)
-            for bit in smart_split(search_term):
-                if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
-                    bit = unescape_string_literal(bit)
-                or_queries = functools.reduce(operator.or_, [Q(**{lookup: bit}) for lookup in lookups], Q())
-                term_queries.append(or_queries)
-            queryset = queryset.filter(functools.reduce(operator.and_, term_queries, Q()))
-            return queryset, False
-
-        return super().get_search_results(request, queryset, search_term)
+        fields = DOCUMENT_FIELDS
+        match = re.match(r"^(title|album|artist): *(.*)$", search_term, flags=re.IGNORECASE | re.DOTALL)
+        if match:
+            fields = SEARCH_PREFIX_FIELDS[match.group(1).lower()]
+            search_term = match.group(2)
+
+        terms = []
+        for bit in smart_split(search_term):
+            if bit.startswith(('"', "'")) and bit[0] == bit[-1]:
+                bit = unescape_string_literal(bit)
+            terms.append(bit)
+
+        return search_tracks(queryset, terms, fields), False
 
     @admin.display(ordering="album__title", description="album")
     def album_link(self, obj: Track):
@@ -314,7 +295,7 @@ class TrackAdmin(AbstractBaseAdmin):
     def album_medium(self, obj: Track):
         return obj.album.get_medium_display() if obj.album else None
 
-    @admin.display(ordering="artist_order", description="artists")
+    @admin.display(ordering="artist_sort", description="artists")
     def artist_list(self, obj: Track):
         return artist_link_list([a.artist for a in obj.track_artists.all()])
 
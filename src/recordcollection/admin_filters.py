@@ -1,10 +1,16 @@
 from datetime import timedelta
 
 from django.contrib import admin
-from django.db.models import Count, Q
-from django.db.models.functions import Lower
+from django.db.models import Q
 
-from recordcollection.models import Genre
+from recordcollection.models import (
+    Album,
+    AlbumArtist,
+    Artist,
+    Track,
+    TrackArtist,
+)
+from recordcollection.utils import get_genre_choices, int_or_none
 
 
 class HasMusicBrainzIDFilter(admin.SimpleListFilter):
@@ -49,26 +55,66 @@ class AlbumCountFilter(admin.SimpleListFilter):
         return queryset
 
 
-class AlbumGenreFilter(admin.RelatedFieldListFilter):
-    def field_choices(self, field, request, model_admin):
-        qs = (
-            Genre.objects
-            .annotate(album_count=Count("albums"))
-            .filter(album_count__gt=0)
-            .order_by("-album_count", Lower("name"))
-        )
-        return [(genre.pk, genre.name) for genre in qs]
-
-
-class TrackGenreFilter(admin.RelatedFieldListFilter):
-    def field_choices(self, field, request, model_admin):
-        qs = (
-            Genre.objects
-            .annotate(track_count=Count("tracks"))
-            .filter(track_count__gt=0)
-            .order_by("-track_count", Lower("name"))
-        )
-        return [(genre.pk, genre.name) for genre in qs]
+class ArtistFilter(admin.SimpleListFilter):
+    """
+    Items credited to an artist, as linked to from the artist admin. Only
+    shows up in the sidebar while in use.
+    """
+    title = "artist"
+    parameter_name = "artist"
+    credit_model: type[AlbumArtist] | type[TrackArtist]
+    item_field: str
+
+    def lookups(self, request, model_admin):
+        artist_id = int_or_none(self.value())
+        if artist_id is None:
+            return []
+        return [(str(artist.pk), artist.name) for artist in Artist.objects.filter(pk=artist_id)]
+
+    def queryset(self, request, queryset):
+        artist_id = int_or_none(self.value())
+        if artist_id is not None:
+            credits = self.credit_model.objects.filter(artist_id=artist_id)
+            return queryset.filter(pk__in=credits.values(self.item_field))
+        return queryset
+
+
+class AlbumArtistFilter(ArtistFilter):
+    credit_model = AlbumArtist
+    item_field = "album"
+
+
+class TrackArtistFilter(ArtistFilter):
+    credit_model = TrackArtist
+    item_field = "track"
+
+
+class GenreFilter(admin.SimpleListFilter):
+    """Filters with a semi-join rather than a join, to avoid duplicates."""
+    title = "genre"
+    parameter_name = "genre"
+    model: type[Album] | type[Track]
+    item_field: str
+
+    def lookups(self, request, model_admin):
+        return get_genre_choices(self.model)
+
+    def queryset(self, request, queryset):
+        genre_id = int_or_none(self.value())
+        if genre_id is not None:
+            genres = self.model.genres.through.objects.filter(genre_id=genre_id)
+            return queryset.filter(pk__in=genres.values(self.item_field))
+        return queryset
+
+
+class AlbumGenreFilter(GenreFilter):
+    model = Album
+    item_field = "album"
+
+
+class TrackGenreFilter(GenreFilter):
+    model = Track
+    item_field = "track"
 
 
 class TrackDurationFilter(admin.SimpleListFilter):
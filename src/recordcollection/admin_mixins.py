@@ -0,0 +1,17 @@
+class SubquerySearchMixin:
+    """
+    Searches like ModelAdmin does, except that searches spanning
+    multi-valued relations are matched in a `pk IN (subquery)` semi-join
+    instead of joins. The results then never contain duplicates, so the
+    changelist doesn't need to deduplicate them.
+    """
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(  # type: ignore
+            request, queryset, search_term
+        )
+        if may_have_duplicates:
+            matches, _ = super().get_search_results(  # type: ignore
+                request, queryset.model._default_manager.all(), search_term
+            )
+            results = queryset.filter(pk__in=matches.values("pk"))
+        return results, False
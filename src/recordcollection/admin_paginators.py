@@ -0,0 +1,222 @@
+import functools
+import hashlib
+import operator
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import Expression, OrderBy
+from django.db.models.functions import Lower, Upper
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+
+COUNT_CACHE_TIMEOUT = 60
+KEYSET_CACHE_TIMEOUT = 10 * 60
+# Below this, table statistics are too rough, and counting is cheap anyway:
+MIN_ESTIMATED_COUNT = 10_000
+
+
+def get_estimated_count(queryset: QuerySet) -> int | None:
+    """The number of rows in the queryset's table, as per table statistics."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        elif connection.vendor == "mysql":
+            cursor.execute(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+                [table],
+            )
+        else:
+            return None
+        row = cursor.fetchone()
+
+    # reltuples is -1 for tables that haven't been analyzed yet:
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def get_sort_keys(queryset: QuerySet) -> list[tuple[str, Expression | F, bool]] | None:
+    """
+    [(alias, expression, descending)] for the queryset's ordering, ending
+    with the primary key so that the keys are unique. None if the ordering
+    is random, or already says where to put NULLs.
+    """
+    ordering = queryset.query.order_by or (queryset.model._meta.ordering if queryset.query.default_ordering else [])
+    keys: list[tuple[str, Expression | F, bool]] = []
+
+    for idx, item in enumerate(ordering):
+        if isinstance(item, str):
+            if item == "?" or "." in item:
+                return None
+            expression, descending = F(item.removeprefix("-")), item.startswith("-")
+        elif isinstance(item, OrderBy):
+            if item.nulls_first or item.nulls_last:
+                return None
+            expression, descending = item.expression, item.descending
+        elif hasattr(item, "resolve_expression"):
+            expression, descending = item, False
+        else:
+            return None
+        keys.append((f"keyset_{idx}", expression, descending))
+
+    if not keys or not (isinstance(keys[-1][1], F) and keys[-1][1].name in ("pk", queryset.model._meta.pk.name)):
+        keys.append((f"keyset_{len(keys)}", F("pk"), False))
+    return keys
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    For admin changelists of big tables.
+
+    The count of an unfiltered queryset comes from the table statistics on
+    PostgreSQL and MySQL. Other counts are exact, but cached for a minute.
+    The count is only used for the total and the page links; pages are
+    fetched with a look-ahead row instead, and correct the count where it
+    turns out to be wrong.
+
+    Each page stores where the next one starts (the sort key values of its
+    last row) in the cache. If the start of a page is known, the page is
+    fetched with a WHERE on the sort keys, which can use their indexes,
+    instead of an OFFSET that has to skip all the rows before it.
+    """
+    object_list: QuerySet
+
+    def __init__(self, object_list: QuerySet, per_page, orphans=0, allow_empty_first_page=True, error_messages=None):
+        self.sort_keys = None if object_list.query.distinct else get_sort_keys(object_list)
+        if self.sort_keys is not None:
+            object_list = object_list.annotate(
+                **{alias: expression for alias, expression, _ in self.sort_keys},
+            ).order_by(
+                *[OrderBy(F(alias), descending=descending) for alias, _, descending in self.sort_keys]
+            )
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page, error_messages)
+
+    @cached_property
+    def query_hash(self) -> str:
+        sql, params = self.object_list.query.get_compiler(self.object_list.db).as_sql()
+        return hashlib.sha1(repr((sql, params)).encode()).hexdigest()
+
+    def get_cache_key(self, *parts) -> str:
+        return ":".join(["admin-paginator", self.query_hash, *[str(part) for part in parts]])
+
+    @cached_property
+    def count(self) -> int:
+        if not self.object_list.query.has_filters() and not self.object_list.query.distinct:
+            estimate = get_estimated_count(self.object_list)
+            if estimate is not None and estimate >= MIN_ESTIMATED_COUNT:
+                return estimate
+
+        key = self.get_cache_key("count")
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    def set_count(self, count: int):
+        self.__dict__["count"] = count
+        self.__dict__.pop("num_pages", None)
+
+    @cached_property
+    def nulls_are_largest(self) -> bool:
+        """Where the backend sorts NULLs, as there's no NULLS FIRST/LAST."""
+        return connections[self.object_list.db].vendor in ("postgresql", "oracle")
+
+    def get_keyset_filter(self, start: list) -> Q | None:
+        """Rows that come after the row with the sort key values `start`."""
+        assert self.sort_keys is not None
+        conditions: list[Q] = []
+        equal = Q()
+
+        for (alias, expression, descending), value in zip(self.sort_keys, start):
+            nulls_after = self.nulls_are_largest != descending
+            if value is None:
+                # Either all the other values come after NULLs, or none:
+                if not nulls_after:
+                    conditions.append(equal & Q(**{f"{alias}__isnull": False}))
+                equal &= Q(**{f"{alias}__isnull": True})
+                continue
+            after = Q(**{f"{alias}__{'lt' if descending else 'gt'}": value})
+            if nulls_after and self.is_nullable(expression):
+                after |= Q(**{f"{alias}__isnull": True})
+            conditions.append(equal & after)
+            equal &= Q(**{alias: value})
+
+        if not conditions:
+            return None
+        # A range on the first key alone, which an index on it can be used
+        # for (the conditions above are ORed, which defeats that):
+        alias, expression, descending = self.sort_keys[0]
+        nulls_after = self.nulls_are_largest != descending
+        if start[0] is None:
+            bound = Q(**{f"{alias}__isnull": True}) if nulls_after else Q()
+        else:
+            bound = Q(**{f"{alias}__{'lte' if descending else 'gte'}": start[0]})
+            if nulls_after and self.is_nullable(expression):
+                bound |= Q(**{f"{alias}__isnull": True})
+        return bound & functools.reduce(operator.or_, conditions)
+
+    def is_nullable(self, expression: Expression | F) -> bool:
+        """False only for non-null columns, or LOWER() or UPPER() of them."""
+        while isinstance(expression, (Lower, Upper)):
+            expression = expression.source_expressions[0]
+        if not isinstance(expression, F) or "__" in expression.name:
+            return True
+        opts = self.object_list.model._meta
+        if expression.name == "pk":
+            return False
+        try:
+            return opts.get_field(expression.name).null
+        except FieldDoesNotExist:
+            # An annotation.
+            return True
+
+    def validate_page_number(self, number) -> int:
+        """Like validate_number(), but with no upper bound from the count."""
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError) as e:
+            raise PageNotAnInteger(self.error_messages["invalid_page"]) from e
+        if number < 1:
+            raise EmptyPage(self.error_messages["min_page"])
+        return number
+
+    def page(self, number):
+        number = self.validate_page_number(number)
+        bottom = (number - 1) * self.per_page
+        # One row more than the last page can have tells if this is it:
+        limit = self.per_page + self.orphans + 1
+
+        start = cache.get(self.get_cache_key(self.per_page, number)) if self.sort_keys and number > 1 else None
+        keyset_filter = self.get_keyset_filter(start) if start is not None else None
+        if keyset_filter is not None:
+            rows = list(self.object_list.filter(keyset_filter)[:limit])
+        else:
+            rows = list(self.object_list[bottom:bottom + limit])
+
+        if not rows and (number > 1 or not self.allow_empty_first_page):
+            raise EmptyPage(self.error_messages["no_results"])
+        if len(rows) < limit:
+            object_list = rows
+            self.set_count(bottom + len(rows))
+        else:
+            object_list = rows[:self.per_page]
+            if self.count < bottom + len(rows):
+                self.set_count(bottom + len(rows))
+
+        if object_list and self.sort_keys is not None:
+            cache.set(
+                self.get_cache_key(self.per_page, number + 1),
+                [getattr(object_list[-1], alias) for alias, _, _ in self.sort_keys],
+                KEYSET_CACHE_TIMEOUT,
+            )
+        return self._get_page(object_list, number, self)
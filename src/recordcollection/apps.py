@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class RecordcollectionConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "recordcollection"
+
+    def ready(self):
+        from recordcollection import (  # noqa pylint: disable=unused-import
+            lookups,
+            signals,
+        )
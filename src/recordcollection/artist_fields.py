@@ -0,0 +1,55 @@
+import threading
+from collections import defaultdict
+from contextlib import AbstractContextManager
+from typing import Iterable
+
+from recordcollection.models import Album, Track
+from recordcollection.utils import DeferredRefresh
+
+
+local = threading.local()
+
+
+def get_pending_instances() -> list[Track | Album]:
+    if not hasattr(local, "instances"):
+        local.instances = []
+    return local.instances
+
+
+def refresh_pending(pending: defaultdict[str, set[int]]):
+    instances = get_pending_instances()
+    local.instances = []
+    values = {
+        Track: Track.update_artist_fields(pending["tracks"]),
+        Album: Album.update_artist_fields(pending["albums"]),
+    }
+
+    for obj in instances:
+        if obj.pk in values[type(obj)]:
+            obj.artist_display, obj.artist_sort = values[type(obj)][obj.pk]
+
+
+refresher = DeferredRefresh(refresh_pending)
+
+
+def mark_artist_fields_dirty(
+    track_ids: Iterable[int] = (),
+    album_ids: Iterable[int] = (),
+    instances: Iterable[Track | Album] = (),
+):
+    """
+    Schedules artist_display and artist_sort refreshes for these tracks and
+    albums, in the manner of statistics.mark_dirty(). `instances` get the new
+    values too, for code that keeps using them.
+    """
+    get_pending_instances().extend(instances)
+    refresher.mark(tracks=track_ids, albums=album_ids)
+
+
+def deferred_artist_fields() -> AbstractContextManager[None]:
+    return refresher.deferred()
+
+
+def flush_artist_fields():
+    """Does the pending refreshes now, for code that needs them up to date."""
+    refresher.flush()
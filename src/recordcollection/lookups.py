@@ -0,0 +1,20 @@
+from django.db.models import CharField
+from django.db.models.lookups import Exact
+
+
+@CharField.register_lookup
+class CaseInsensitiveExact(Exact):
+    """
+    Like iexact, but as LOWER(column) = LOWER(value), which the Lower()
+    indexes on the models can be used for. (iexact is a LIKE on SQLite, and
+    UPPER() on PostgreSQL.) MySQL and MariaDB compare case-insensitively
+    with their default collations anyway, and can use the plain indexes.
+    """
+    lookup_name = "ciexact"
+
+    def as_sql(self, compiler, connection):
+        if connection.vendor == "mysql":
+            return super().as_sql(compiler, connection)
+        lhs_sql, lhs_params = self.process_lhs(compiler, connection)
+        rhs_sql, rhs_params = self.process_rhs(compiler, connection)
+        return f"LOWER({lhs_sql}) = LOWER({rhs_sql})", [*lhs_params, *rhs_params]
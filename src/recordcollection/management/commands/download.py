@@ -1,76 +1,108 @@
-import dataclasses
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 
-import requests
 from django.core.management.base import BaseCommand, CommandParser
 
-from recordcollection.utils import sanitize_filename
+from recordcollection.models import Track
+from recordcollection.utils import resolve_external_ids
+from spotify.dataclasses import SpotifySimplifiedTrack
 from spotify.functions import (
+    get_spotify_album_tracks,
+    get_spotify_playlist_tracks,
     get_spotify_track,
-    get_spotify_track_id_from_link,
-    is_spotify_track_link,
 )
-from youtube.clients import YoutubeAndroidTestSuiteClient, YoutubeWebClient
+from youtube.functions import DownloadJob, DownloadResult, TrackDownloader
 
 
 class Command(BaseCommand):
+    last_percent = -1
+
     def add_arguments(self, parser: CommandParser):
         group = parser.add_mutually_exclusive_group(required=True)
-        group.add_argument("--spotify", "-s")
+        group.add_argument("--spotify", "-s", help="Spotify track ID or link")
+        group.add_argument("--spotify-album", help="Spotify album ID or link")
+        group.add_argument("--spotify-playlist", help="Spotify playlist ID or link")
+        group.add_argument("--missing", action="store_true", help="Download all tracks that have no file")
         group.add_argument("--discogs", "-d")
         group.add_argument("--musicbrainz", "-m")
+        parser.add_argument("--output", "-o", type=Path, default=Path("."), help="Directory to save files in")
+        parser.add_argument("--jobs", "-j", type=int, default=4, help="Number of tracks to download at a time")
+        parser.add_argument("--per-host", type=int, default=4, help="Max concurrent requests per host")
+        parser.add_argument("--workers", type=int, default=8, help="Number of concurrent metadata lookups")
+        parser.add_argument("--segments", type=int, default=4, help="Number of parallel download connections")
 
     def handle(self, *args, **options):
+        jobs: list[DownloadJob]
+
         if options["spotify"]:
-            track_id: str
-            if is_spotify_track_link(options["spotify"]):
-                track_id = get_spotify_track_id_from_link(options["spotify"])
-            else:
-                track_id = options["spotify"]
-            self.download_spotify_track(track_id)
-        elif options["discogs"]:
-            self.stdout.write("Not implemented yet.")
-        elif options["musicbrainz"]:
+            jobs = self.get_spotify_jobs([get_spotify_track(options["spotify"])])
+        elif options["spotify_album"]:
+            _, spotify_tracks = get_spotify_album_tracks(options["spotify_album"])
+            jobs = self.get_spotify_jobs(spotify_tracks)
+        elif options["spotify_playlist"]:
+            jobs = self.get_spotify_jobs(get_spotify_playlist_tracks(options["spotify_playlist"]))
+        elif options["missing"]:
+            tracks = Track.objects.filter(file_path=None).prefetch_related("track_artists__artist")
+            jobs = [DownloadJob.from_track(track) for track in tracks]
+        else:
             self.stdout.write("Not implemented yet.")
+            return
 
-    def download_spotify_track(self, track_id: str):
-        spotify_track = get_spotify_track(track_id)
-        query = f"{spotify_track.artist_string} {spotify_track.name}".strip()
-        videos = [
-            dataclasses.replace(video, metadata=YoutubeAndroidTestSuiteClient().get_best_metadata(video.id))
-            for video in YoutubeWebClient().get_video_search_results(query)
-        ]
-        video_matches = sorted(
-            [(video, video.match_spotify_track(spotify_track)) for video in videos],
-            key=lambda m: m[1],
-            reverse=True,
+        options["output"].mkdir(parents=True, exist_ok=True)
+        downloader = TrackDownloader(
+            directory=options["output"],
+            workers=options["workers"],
+            segments=options["segments"],
+            per_host=options["per_host"],
         )
-        if video_matches and video_matches[0][1] >= 0.9:
-            video, score = video_matches[0]
-            assert video.metadata is not None
-
-            basename = sanitize_filename(
-                f"{spotify_track.artist_string} - {spotify_track.name}"
-                if spotify_track.artist_string
-                else spotify_track.name
-            )
-            filename = f"{basename}.{video.metadata.file_extension}"
-
-            self.stdout.write(f"Best match: {video.title} ({video.web_url}) (score: {score})")
-            response = requests.get(video.metadata.url, stream=True, timeout=None)
-
-            if response.ok:
-                length = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
-                i = 1
-                last_percent = -1
-
-                with open(filename, "wb") as f:
-                    for chunk in response.iter_content(chunk_size=10_000):
-                        percent = round(((i * 10_000) / length) * 100) if length else None
-                        if percent is not None and percent > last_percent:
-                            self.stdout.write(f"\r{percent:3}% " + ("*" * percent), ending="")
-                        f.write(chunk)
-                        i += 1
-
-                self.stdout.write(f"\nTrack was saved as {filename}.")
-
-            response.close()
+
+        if len(jobs) == 1:
+            result = self.run_job(downloader, jobs[0], progress=True)
+            if result:
+                self.save_file_path(jobs[0], result)
+            return
+
+        downloaded = 0
+        with ThreadPoolExecutor(max_workers=options["jobs"]) as executor:
+            futures = {executor.submit(self.run_job, downloader, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    self.stderr.write(f"{job}: {e}")
+                    continue
+                if result:
+                    self.save_file_path(job, result)
+                    downloaded += 1
+
+        self.stdout.write(f"Downloaded {downloaded} of {len(jobs)} tracks.")
+
+    def get_spotify_jobs(self, spotify_tracks: list[SpotifySimplifiedTrack]) -> list[DownloadJob]:
+        track_ids = resolve_external_ids(Track, "spotify_id", [t.id for t in spotify_tracks])
+        return [DownloadJob.from_spotify_track(t, track_id=track_ids.get(t.id)) for t in spotify_tracks]
+
+    def run_job(self, downloader: TrackDownloader, job: DownloadJob, progress: bool = False) -> DownloadResult | None:
+        best_match = downloader.find_best_video(job)
+        if best_match is None:
+            self.stdout.write(f"{job}: No good match found.")
+            return None
+
+        video, score = best_match
+        self.stdout.write(f"{job}: Best match: {video.title} ({video.web_url}) (score: {score})")
+        result = downloader.download(job, video, progress=self.write_progress if progress else None)
+        if progress:
+            self.stdout.write("")
+        self.stdout.write(f"{job}: Saved as {result.path} ({result.mb_per_second:.2f} MB/s).")
+        return result
+
+    def save_file_path(self, job: DownloadJob, result: DownloadResult):
+        if job.track_id is not None:
+            Track.objects.filter(id=job.track_id).update(file_path=str(result.path.resolve()))
+
+    def write_progress(self, done: int, total: int | None):
+        if total:
+            percent = round((done / total) * 100)
+            if percent > self.last_percent:
+                self.stdout.write(f"\r{percent:3}% " + ("*" * percent), ending="")
+                self.last_percent = percent
@@ -1,13 +1,10 @@
-import functools
-import operator
-import re
-from typing import Iterator, Sequence
+from collections import defaultdict
+from typing import Iterator
 
 from django.core.management.base import BaseCommand, CommandParser
-from django.db.models import Q
 
 from recordcollection.models import Album, Artist, Track
-from recordcollection.utils import chunked
+from recordcollection.utils import AhoCorasick, chunked
 
 
 class Command(BaseCommand):
@@ -17,27 +14,26 @@ class Command(BaseCommand):
         parser.add_argument("--wholewords", "-w", action="store_true")
 
     def get_matches(self, mode: str, rows: list[str], wholewords: bool = False) -> Iterator[tuple[str, list[str]]]:
+        """
+        Scans each title or name once for all the rows, with results in the
+        model's default order.
+        """
+        rows = [row for row in rows if row]
+        automaton = AhoCorasick(rows, wholewords=wholewords)
+        model, field = self.get_model_and_field(mode)
+        matched_ids: defaultdict[int, list[int]] = defaultdict(list)
+
+        for pk, text in model.objects.values_list("pk", field).iterator(chunk_size=2000):
+            for idx in automaton.find(text):
+                matched_ids[idx].append(pk)
+
         qs = self.get_queryset(mode)
-        for chunk in chunked(rows, 100):
-            chunk_filter = self.get_filter(mode, chunk)
-            chunk_objects = list(qs.filter(chunk_filter))
-            for row in chunk:
-                if wholewords:
-                    patt = re.compile(rf"(?<!\w){row}(?!\w)", flags=re.IGNORECASE)
-                else:
-                    patt = re.compile(row, flags=re.IGNORECASE)
-                row_strings = []
-                for obj in chunk_objects:
-                    if self.object_matches(obj, patt):
-                        row_strings.append(self.object_to_string(obj))
-                yield row, row_strings
+        objects: dict[int, Track | Artist | Album] = {}
+        for chunk in chunked(list({pk for pks in matched_ids.values() for pk in pks}), 500):
+            objects.update(qs.in_bulk(chunk))
 
-    def object_matches(self, obj: Track | Artist | Album, patt: re.Pattern) -> bool:
-        if isinstance(obj, Album):
-            return bool(patt.search(obj.title))
-        if isinstance(obj, Artist):
-            return bool(patt.search(obj.name))
-        return bool(patt.search(obj.title))
+        for idx, row in enumerate(rows):
+            yield row, [self.object_to_string(objects[pk]) for pk in matched_ids[idx]]
 
     def object_to_string(self, obj: Track | Artist | Album) -> str:
         if isinstance(obj, Album):
@@ -54,19 +50,19 @@ class Command(BaseCommand):
             output += f" ({obj.album.title})"
         return output
 
-    def get_filter(self, mode: str, chunk: Sequence[str]):
+    def get_model_and_field(self, mode: str) -> tuple[type[Track] | type[Artist] | type[Album], str]:
         if mode == "album":
-            return functools.reduce(operator.or_, [Q(title__icontains=row) for row in chunk], Q())
+            return Album, "title"
         if mode == "artist":
-            return functools.reduce(operator.or_, [Q(name__icontains=row) for row in chunk], Q())
-        return functools.reduce(operator.or_, [Q(title__icontains=row) for row in chunk], Q())
+            return Artist, "name"
+        return Track, "title"
 
     def get_queryset(self, mode: str):
         if mode == "album":
-            return Album.objects.prefetch_related("album_artists__artist")
+            return Album.objects.all()
         if mode == "artist":
             return Artist.objects.all()
-        return Track.objects.select_related("album").prefetch_related("track_artists__artist")
+        return Track.objects.select_related("album")
 
     def handle(self, *args, **options):
         rows = []
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from recordcollection.models import TrackSearchDocument
+from recordcollection.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rewrites all track search documents and rebuilds the full-text index"
+
+    def handle(self, *args, **options):
+        rebuild_search_index()
+        self.stdout.write(f"Indexed {TrackSearchDocument.objects.count()} tracks.")
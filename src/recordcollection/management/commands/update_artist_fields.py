@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandParser
+
+from recordcollection.models import Album, Track
+
+
+class Command(BaseCommand):
+    help = "Recomputes the stored artist_display/artist_sort of all tracks and albums"
+
+    def add_arguments(self, parser: CommandParser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        for model in (Track, Album):
+            ids = list(model.objects.values_list("pk", flat=True))
+            for start in range(0, len(ids), options["batch_size"]):
+                model.update_artist_fields(ids[start:start + options["batch_size"]])
+                self.stdout.write(
+                    f"\r{model._meta.verbose_name_plural}: {min(start + options['batch_size'], len(ids))}/{len(ids)}",
+                    ending="",
+                )
+            self.stdout.write(f"\r{model._meta.verbose_name_plural}: {len(ids)}/{len(ids)}")
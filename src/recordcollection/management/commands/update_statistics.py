@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recordcollection.models import Album, Artist
+from recordcollection.statistics import (
+    refresh_album_statistics,
+    refresh_artist_statistics,
+)
+
+
+class Command(BaseCommand):
+    help = "Recomputes the album and artist statistics from scratch"
+
+    def handle(self, *args, **options):
+        album_ids = list(Album.objects.values_list("pk", flat=True))
+        refresh_album_statistics(album_ids)
+        self.stdout.write(f"Refreshed statistics for {len(album_ids)} albums.")
+
+        artist_ids = list(Artist.objects.values_list("pk", flat=True))
+        refresh_artist_statistics(artist_ids)
+        self.stdout.write(f"Refreshed statistics for {len(artist_ids)} artists.")
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:06
+
+from django.db import migrations, models
+
+from recordcollection.models import update_artist_fields
+
+
+def fill_artist_fields(apps, schema_editor):
+    using = schema_editor.connection.alias
+    for model_name, credit_model_name, field_name in (
+        ('Track', 'TrackArtist', 'track_id'),
+        ('Album', 'AlbumArtist', 'album_id'),
+    ):
+        model = apps.get_model('recordcollection', model_name)
+        credit_model = apps.get_model('recordcollection', credit_model_name)
+        ids = list(model.objects.using(using).order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), 5000):
+            update_artist_fields(model, credit_model, field_name, ids[start:start + 5000], using=using)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordcollection', '0007_track_play_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='album',
+            name='artist_display',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='album',
+            name='artist_sort',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='artist_display',
+            field=models.CharField(blank=True, default='', editable=False, max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='artist_sort',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.RunPython(fill_artist_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from recordcollection.statistics import (
+    refresh_album_statistics,
+    refresh_artist_statistics,
+)
+
+
+def fill_statistics(apps, schema_editor):
+    # The refresh uses the current models, but only columns that exist as of
+    # this migration:
+    for model_name, refresh in (('Album', refresh_album_statistics), ('Artist', refresh_artist_statistics)):
+        ids = list(apps.get_model('recordcollection', model_name).objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(ids), 5000):
+            refresh(ids[start:start + 5000])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordcollection', '0008_track_album_artist_display'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlbumStatistics',
+            fields=[
+                ('album', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='recordcollection.album')),
+                ('track_count', models.IntegerField(default=0)),
+                ('play_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'album statistics',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArtistStatistics',
+            fields=[
+                ('artist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='statistics', serialize=False, to='recordcollection.artist')),
+                ('album_count', models.IntegerField(default=0)),
+                ('track_count', models.IntegerField(default=0)),
+                ('play_count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'artist statistics',
+            },
+        ),
+        migrations.RunPython(fill_statistics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from recordcollection.search import refresh_search_documents
+
+
+TABLE = 'recordcollection_tracksearchdocument'
+FTS_TABLE = 'recordcollection_tracksearchdocument_fts'
+COLUMNS = ['title', 'artists', 'album', 'genres', 'years']
+
+
+def fill_search_documents(apps, schema_editor):
+    # The refresh uses the current models, but only columns that exist as of
+    # this migration:
+    ids = list(apps.get_model('recordcollection', 'Track').objects.order_by('pk').values_list('pk', flat=True))
+    for start in range(0, len(ids), 5000):
+        refresh_search_documents(ids[start:start + 5000])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        columns = ', '.join(COLUMNS)
+        old_values = ', '.join(f'old.{column}' for column in COLUMNS)
+        new_values = ', '.join(f'new.{column}' for column in COLUMNS)
+        delete_old = f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.track_id, {old_values});"
+        insert_new = f'INSERT INTO {FTS_TABLE} (rowid, {columns}) VALUES (new.track_id, {new_values});'
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, content='{TABLE}', content_rowid='track_id', "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        schema_editor.execute(f'CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN {insert_new} END')
+        schema_editor.execute(f'CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN {delete_old} END')
+        schema_editor.execute(
+            f'CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN {delete_old} {insert_new} END'
+        )
+        # Indexes the documents filled in before:
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        # Django's icontains is UPPER(column) LIKE UPPER(pattern):
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for column in COLUMNS:
+            schema_editor.execute(
+                f'CREATE INDEX {TABLE}_{column}_trgm ON {TABLE} USING gin (UPPER({column}) gin_trgm_ops)'
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        for column in COLUMNS:
+            schema_editor.execute(f'DROP INDEX IF EXISTS {TABLE}_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordcollection', '0009_album_artist_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackSearchDocument',
+            fields=[
+                ('track', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recordcollection.track')),
+                ('title', models.TextField(default='')),
+                ('artists', models.TextField(default='')),
+                ('album', models.TextField(default='')),
+                ('genres', models.TextField(default='')),
+                ('years', models.TextField(default='')),
+            ],
+        ),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
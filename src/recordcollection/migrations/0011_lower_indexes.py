@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:42
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordcollection', '0010_tracksearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='album_title_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='genre',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='genre_name_ci'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(django.db.models.functions.text.Lower('title'), name='track_title_ci'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recordcollection', '0011_lower_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('musicbrainz_id__isnull', False)), fields=['musicbrainz_id'], name='album_musicbrainz_id'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('spotify_id__isnull', False)), fields=['spotify_id'], name='album_spotify_id'),
+        ),
+        migrations.AddIndex(
+            model_name='album',
+            index=models.Index(condition=models.Q(('discogs_id__isnull', False)), fields=['discogs_id'], name='album_discogs_id'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(condition=models.Q(('musicbrainz_id__isnull', False)), fields=['musicbrainz_id'], name='artist_musicbrainz_id'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(condition=models.Q(('spotify_id__isnull', False)), fields=['spotify_id'], name='artist_spotify_id'),
+        ),
+        migrations.AddIndex(
+            model_name='artist',
+            index=models.Index(condition=models.Q(('discogs_id__isnull', False)), fields=['discogs_id'], name='artist_discogs_id'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(condition=models.Q(('musicbrainz_id__isnull', False)), fields=['musicbrainz_id'], name='track_musicbrainz_id'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(condition=models.Q(('spotify_id__isnull', False)), fields=['spotify_id'], name='track_spotify_id'),
+        ),
+        migrations.AddIndex(
+            model_name='track',
+            index=models.Index(condition=models.Q(('discogs_id__isnull', False)), fields=['discogs_id'], name='track_discogs_id'),
+        ),
+    ]
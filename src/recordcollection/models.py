@@ -1,10 +1,15 @@
-from typing import Self
+from collections import defaultdict
+from typing import TYPE_CHECKING, Iterable, Self
 
 from django.contrib import admin
-from django.db import models
+from django.db import connections, models, router
 from django.db.models.functions import Lower
 
 
+if TYPE_CHECKING:
+    from musicbrainz.dataclasses import MusicBrainzRelease
+
+
 class AbstractItem(models.Model):
     musicbrainz_id = models.CharField(max_length=200, null=True, default=None, blank=True)
     spotify_id = models.CharField(max_length=200, null=True, default=None, blank=True)
@@ -12,6 +17,17 @@ class AbstractItem(models.Model):
 
     class Meta:
         abstract = True
+        # Most items have no id from some service, so only index those that
+        # do. Not unique: several tracks can be the same recording, and a
+        # Discogs collection can have several copies of a release.
+        indexes = [
+            models.Index(
+                fields=[field],
+                condition=models.Q(**{f"{field}__isnull": False}),
+                name=f"%(class)s_{field}",
+            )
+            for field in ["musicbrainz_id", "spotify_id", "discogs_id"]
+        ]
 
 
 class Genre(models.Model):
@@ -19,6 +35,7 @@ class Genre(models.Model):
 
     class Meta:
         ordering = [Lower("name")]
+        indexes = [models.Index(Lower("name"), name="genre_name_ci")]
 
     def __str__(self):
         return self.name
@@ -36,32 +53,41 @@ class Track(AbstractItem):
     file_path = models.CharField(max_length=1000, null=True, default=None, blank=True, db_index=True)
     genres = models.ManyToManyField("Genre", related_name="tracks", blank=True)
     play_count = models.IntegerField(default=0)
+    # Kept up to date from the artist credits by signals:
+    artist_display = models.CharField(max_length=1000, default="", blank=True, editable=False)
+    artist_sort = models.CharField(max_length=500, default="", blank=True, editable=False, db_index=True)
 
     track_artists: models.Manager["TrackArtist"]
     album_id: int | None
+    # The album_id it was loaded or last saved with, for signals to tell
+    # which album it's moved away from:
+    saved_album_id: int | None
 
-    class Meta:
+    class Meta(AbstractItem.Meta):
         ordering = [Lower("title")]
+        indexes = [*AbstractItem.Meta.indexes, models.Index(Lower("title"), name="track_title_ci")]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "album_id" in field_names:
+            instance.saved_album_id = instance.album_id
+        return instance
+
     @classmethod
     def prefetched(cls) -> models.QuerySet[Self]:
         return cls.objects.prefetch_related("track_artists__artist", "genres")
 
     @admin.display(description="artist")
     def artist_string(self) -> str:
-        result = ""
-        track_artists = list(self.track_artists.all())
+        return self.artist_display
 
-        for idx, track_artist in enumerate(track_artists):
-            result += track_artist.artist.name
-            if len(track_artists) > idx + 1:
-                join_phrase = track_artist.join_phrase or "/"
-                result += f" {join_phrase} "
-
-        return result
+    @classmethod
+    def update_artist_fields(cls, ids: Iterable[int]) -> dict[int, tuple[str, str]]:
+        return update_artist_fields(cls, TrackArtist, "track_id", ids)
 
 
 class Album(AbstractItem):
@@ -79,13 +105,17 @@ class Album(AbstractItem):
     is_compilation = models.BooleanField(default=False, verbose_name="V/A")
     medium = models.CharField(max_length=3, choices=Medium.choices, null=True, default=None, blank=True)
     genres = models.ManyToManyField("Genre", related_name="albums", blank=True)
+    # Kept up to date from the artist credits by signals:
+    artist_display = models.CharField(max_length=1000, default="", blank=True, editable=False)
+    artist_sort = models.CharField(max_length=500, default="", blank=True, editable=False, db_index=True)
 
     album_artists: models.Manager["AlbumArtist"]
 
     tracks: models.Manager["Track"]
 
-    class Meta:
+    class Meta(AbstractItem.Meta):
         ordering = [Lower("title")]
+        indexes = [*AbstractItem.Meta.indexes, models.Index(Lower("title"), name="album_title_ci")]
 
     def __str__(self):
         return self.title
@@ -103,22 +133,21 @@ class Album(AbstractItem):
     def artist_string(self) -> str | None:
         if self.is_compilation:
             return None
+        return self.artist_display
 
-        result = ""
-        album_artists = list(self.album_artists.all())
-
-        for idx, album_artist in enumerate(album_artists):
-            result += album_artist.artist.name
-            if len(album_artists) > idx + 1:
-                join_phrase = album_artist.join_phrase or "/"
-                result += f" {join_phrase} "
-
-        return result
+    @classmethod
+    def update_artist_fields(cls, ids: Iterable[int]) -> dict[int, tuple[str, str]]:
+        return update_artist_fields(cls, AlbumArtist, "album_id", ids)
 
     def update_from_musicbrainz(self) -> "Album":
         from musicbrainz.functions import get_best_musicbrainz_album_match
+        from recordcollection.artist_fields import flush_artist_fields
+
+        # The match is partly on artist_display:
+        flush_artist_fields()
+        return self.apply_musicbrainz_match(get_best_musicbrainz_album_match(album=self))
 
-        match = get_best_musicbrainz_album_match(album=self)
+    def apply_musicbrainz_match(self, match: "MusicBrainzRelease.AlbumMatch | None") -> "Album":
         if match and match.ratio >= 0.8:
             return match.release.update_album(album=self)
         if self.musicbrainz_id is None:
@@ -130,10 +159,12 @@ class Album(AbstractItem):
 class Artist(AbstractItem):
     name = models.CharField(max_length=500, db_index=True)
 
-    class Meta:
+    class Meta(AbstractItem.Meta):
         ordering = [Lower("name")]
         constraints = [
-            # MariaDB doesn't support unique constraints on expressions:
+            # Also the index for ciexact lookups and the ordering. MariaDB
+            # doesn't support unique constraints on expressions, but compares
+            # case-insensitively with its default collations anyway:
             models.UniqueConstraint(Lower("name"), name="unique_artist_name_ci"),
             models.UniqueConstraint("name", name="unique_artist_name"),
         ]
@@ -143,7 +174,7 @@ class Artist(AbstractItem):
 
     @classmethod
     def iupdate_or_create(cls, name: str, **kwargs):
-        artist = cls.objects.filter(name__iexact=name).first()
+        artist = cls.objects.filter(name__ciexact=name).first()
         if artist:
             if any(getattr(artist, key) != value for key, value in kwargs.items()):
                 for key, value in kwargs.items():
@@ -179,3 +210,100 @@ class AlbumArtist(AbstractArtistCredit):
         constraints = [
             models.UniqueConstraint(fields=["album", "artist"], name="unique_album_artist"),
         ]
+
+
+def update_artist_fields(
+    model: type[Track] | type[Album],
+    credit_model: type[TrackArtist] | type[AlbumArtist],
+    field_name: str,
+    ids: Iterable[int],
+    batch_size: int = 500,
+    using: str | None = None,
+) -> dict[int, tuple[str, str]]:
+    """
+    Recomputes artist_display and artist_sort for the tracks or albums with
+    these ids from their credits, and returns {id: (display, sort)}.
+    """
+    result: dict[int, tuple[str, str]] = {}
+    ids = list(ids)
+    using = using or router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    # One UPDATE statement run for many rows; bulk_update()'s CASE WHEN
+    # expressions take about a millisecond per row to build:
+    update_sql = (
+        f"UPDATE {qn(model._meta.db_table)} "
+        f"SET {qn(model._meta.get_field('artist_display').column)} = %s, "
+        f"{qn(model._meta.get_field('artist_sort').column)} = %s "
+        f"WHERE {qn(model._meta.pk.column)} = %s"
+    )
+    display_length = model._meta.get_field("artist_display").max_length
+    sort_length = model._meta.get_field("artist_sort").max_length
+
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        credits: defaultdict[int, list[tuple[str, str]]] = defaultdict(list)
+
+        for item_id, name, join_phrase in (
+            credit_model.objects
+            .using(using)
+            .filter(**{f"{field_name}__in": batch})
+            .order_by(field_name, "position", "pk")
+            .values_list(field_name, "artist__name", "join_phrase")
+        ):
+            credits[item_id].append((name, join_phrase))
+
+        for item_id in batch:
+            display = ""
+            for idx, (name, join_phrase) in enumerate(credits[item_id]):
+                display += name
+                if len(credits[item_id]) > idx + 1:
+                    display += f" {join_phrase or '/'} "
+            sort = credits[item_id][0][0].lower() if credits[item_id] else ""
+            result[item_id] = (display[:display_length], sort[:sort_length])
+
+        with connection.cursor() as cursor:
+            cursor.executemany(update_sql, [(*result[pk], pk) for pk in batch])
+
+    return result
+
+
+class AlbumStatistics(models.Model):
+    """Maintained by recordcollection.statistics."""
+    album = models.OneToOneField("Album", on_delete=models.CASCADE, primary_key=True, related_name="statistics")
+    track_count = models.IntegerField(default=0)
+    play_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "album statistics"
+
+
+class ArtistStatistics(models.Model):
+    """
+    Maintained by recordcollection.statistics. play_count is the sum over the
+    tracks credited to the artist or on albums credited to them, counting
+    each track once.
+    """
+    artist = models.OneToOneField("Artist", on_delete=models.CASCADE, primary_key=True, related_name="statistics")
+    album_count = models.IntegerField(default=0)
+    track_count = models.IntegerField(default=0)
+    play_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "artist statistics"
+
+
+class TrackSearchDocument(models.Model):
+    """
+    The searchable text of a track, maintained by recordcollection.search.
+    Indexed by an FTS5 table on SQLite and by trigram indexes on PostgreSQL
+    (see migration 0010).
+    """
+    track = models.OneToOneField("Track", on_delete=models.CASCADE, primary_key=True, related_name="search_document")
+    title = models.TextField(default="")
+    # Track and album artists:
+    artists = models.TextField(default="")
+    album = models.TextField(default="")
+    genres = models.TextField(default="")
+    # Track and album years:
+    years = models.TextField(default="")
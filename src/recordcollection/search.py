@@ -0,0 +1,164 @@
+import functools
+import operator
+import re
+from collections import defaultdict
+from contextlib import AbstractContextManager
+from typing import Iterable, Sequence
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+from recordcollection.models import (
+    AlbumArtist,
+    Track,
+    TrackArtist,
+    TrackSearchDocument,
+)
+from recordcollection.utils import DeferredRefresh, chunked, upsert_objects
+
+
+DOCUMENT_FIELDS = ["title", "artists", "album", "genres", "years"]
+FTS_TABLE = "recordcollection_tracksearchdocument_fts"
+
+
+@functools.cache
+def uses_fts(alias: str) -> bool:
+    """False on SQLite builds without FTS5, where migration 0010 skipped it."""
+    connection = connections[alias]
+    return connection.vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names()
+
+
+def get_fts_query(terms: Iterable[str], fields: Sequence[str]) -> str:
+    """
+    Every term has to match a word prefix (or a phrase ending in one) in any
+    of the fields. Terms without any word characters can't, so they are left
+    out.
+    """
+    columns = " ".join(fields)
+    phrases = ['"' + term.replace('"', '""') + '"*' for term in terms if re.search(r"\w", term)]
+    return " AND ".join(f"{{{columns}}} : {phrase}" for phrase in phrases)
+
+
+def search_tracks(queryset: QuerySet[Track], terms: Iterable[str], fields: Sequence[str] = DOCUMENT_FIELDS):
+    """
+    Filters `queryset` down to the tracks whose search documents match all of
+    `terms`, each of them in any of `fields`. On SQLite, terms are matched
+    against word beginnings; elsewhere anywhere in the text.
+    """
+    terms = [term for term in terms if term.strip()]
+
+    if uses_fts(queryset.db):
+        query = get_fts_query(terms, fields)
+        if not query:
+            return queryset
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query]),
+        )
+
+    for term in terms:
+        queryset = queryset.filter(
+            functools.reduce(
+                operator.or_,
+                [Q(**{f"search_document__{field}__icontains": term}) for field in fields],
+            )
+        )
+    return queryset
+
+
+def refresh_search_documents(track_ids: Iterable[int]):
+    """Rewrites the search documents of these tracks, where they changed."""
+    for chunk in chunked(list(track_ids), 500):
+        rows = list(
+            Track.objects
+            .filter(pk__in=chunk)
+            .order_by()
+            .values_list("pk", "title", "year", "album_id", "album__title", "album__year")
+        )
+        artists: defaultdict[int, list[str]] = defaultdict(list)
+        album_artists: defaultdict[int | None, list[str]] = defaultdict(list)
+        genres: defaultdict[int, list[str]] = defaultdict(list)
+
+        for track_id, name in (
+            TrackArtist.objects
+            .filter(track_id__in=chunk)
+            .order_by("track_id", "position", "pk")
+            .values_list("track_id", "artist__name")
+        ):
+            artists[track_id].append(name)
+        for album_id, name in (
+            AlbumArtist.objects
+            .filter(album_id__in={row[3] for row in rows if row[3] is not None})
+            .order_by("album_id", "position", "pk")
+            .values_list("album_id", "artist__name")
+        ):
+            album_artists[album_id].append(name)
+        for track_id, name in (
+            Track.genres.through.objects
+            .filter(track_id__in=chunk)
+            .order_by("genre__name")
+            .values_list("track_id", "genre__name")
+        ):
+            genres[track_id].append(name)
+
+        existing = {
+            row[0]: row[1:]
+            for row in TrackSearchDocument.objects.filter(pk__in=chunk).values_list("pk", *DOCUMENT_FIELDS)
+        }
+        documents: list[TrackSearchDocument] = []
+
+        for track_id, title, year, album_id, album_title, album_year in rows:
+            document = TrackSearchDocument(
+                track_id=track_id,
+                title=title,
+                artists=" / ".join(dict.fromkeys(artists[track_id] + album_artists[album_id])),
+                album=album_title or "",
+                genres=" / ".join(genres[track_id]),
+                years=" ".join(str(y) for y in dict.fromkeys([year, album_year]) if y is not None),
+            )
+            if existing.get(track_id) != tuple(getattr(document, field) for field in DOCUMENT_FIELDS):
+                documents.append(document)
+
+        upsert_objects(TrackSearchDocument, documents, unique_field="track", update_fields=DOCUMENT_FIELDS)
+
+
+def rebuild_search_index():
+    refresh_search_documents(Track.objects.order_by().values_list("pk", flat=True))
+    if uses_fts(TrackSearchDocument.objects.db):
+        with connections[TrackSearchDocument.objects.db].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def refresh_pending(pending: defaultdict[str, set[int]]):
+    track_ids = pending["tracks"]
+
+    for chunk in chunked(list(pending["albums"]), 500):
+        track_ids.update(Track.objects.filter(album_id__in=chunk).order_by().values_list("pk", flat=True))
+    for chunk in chunked(list(pending["artists"]), 500):
+        track_ids.update(TrackArtist.objects.filter(artist_id__in=chunk).values_list("track_id", flat=True))
+        track_ids.update(
+            Track.objects.filter(album__album_artists__artist_id__in=chunk).order_by().values_list("pk", flat=True)
+        )
+
+    refresh_search_documents(track_ids)
+
+
+refresher = DeferredRefresh(refresh_pending)
+
+
+def mark_documents_dirty(
+    track_ids: Iterable[int] = (),
+    album_ids: Iterable[int] = (),
+    artist_ids: Iterable[int] = (),
+):
+    """
+    Schedules search document refreshes for these tracks, and for the tracks
+    on these albums or by these artists, in the manner of
+    statistics.mark_dirty().
+    """
+    refresher.mark(tracks=track_ids, albums=album_ids, artists=artist_ids)
+
+
+def deferred_search_index() -> AbstractContextManager[None]:
+    return refresher.deferred()
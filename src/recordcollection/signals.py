@@ -0,0 +1,164 @@
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from recordcollection.artist_fields import mark_artist_fields_dirty
+from recordcollection.models import (
+    Album,
+    AlbumArtist,
+    Artist,
+    Genre,
+    Track,
+    TrackArtist,
+)
+from recordcollection.search import mark_documents_dirty
+from recordcollection.statistics import mark_dirty
+from recordcollection.utils import invalidate_genre_choices
+
+
+@receiver([post_save, post_delete], sender=TrackArtist)
+def track_artist_changed(sender, instance: TrackArtist, **kwargs):
+    if not kwargs.get("raw"):
+        mark_dirty(artist_ids=[instance.artist_id])
+        mark_documents_dirty(track_ids=[instance.track_id])
+        mark_artist_fields_dirty(
+            track_ids=[instance.track_id],
+            instances=[instance.track] if TrackArtist.track.is_cached(instance) else [],
+        )
+
+
+@receiver([post_save, post_delete], sender=AlbumArtist)
+def album_artist_changed(sender, instance: AlbumArtist, **kwargs):
+    if not kwargs.get("raw"):
+        mark_dirty(artist_ids=[instance.artist_id])
+        mark_documents_dirty(album_ids=[instance.album_id])
+        mark_artist_fields_dirty(
+            album_ids=[instance.album_id],
+            instances=[instance.album] if AlbumArtist.album.is_cached(instance) else [],
+        )
+
+
+@receiver(m2m_changed, sender=TrackArtist)
+@receiver(m2m_changed, sender=AlbumArtist)
+def artists_changed(
+    sender,
+    instance: Track | Album | Artist,
+    action: str,
+    reverse: bool,
+    pk_set: set[int] | None,
+    **kwargs,
+):
+    # add() creates the credits without post_save; remove() and clear()
+    # delete them with post_delete, which has already marked them.
+    item_kwarg = "track_ids" if sender is TrackArtist else "album_ids"
+    if action in ("post_add", "post_remove", "post_clear") and not reverse:
+        mark_artist_fields_dirty(**{item_kwarg: [instance.pk]}, instances=[instance])
+    elif action == "post_add" and pk_set:
+        mark_artist_fields_dirty(**{item_kwarg: pk_set})
+    if action == "post_add":
+        mark_dirty(artist_ids=[instance.pk] if reverse else pk_set or [])
+        mark_documents_dirty(**{item_kwarg: (pk_set or []) if reverse else [instance.pk]})
+
+
+@receiver(post_save, sender=Artist)
+def artist_saved(sender, instance: Artist, created: bool, update_fields: frozenset | None, **kwargs):
+    if created and not kwargs.get("raw"):
+        mark_dirty(artist_ids=[instance.pk])
+    if not created and not kwargs.get("raw") and (update_fields is None or "name" in update_fields):
+        mark_artist_fields_dirty(
+            track_ids=TrackArtist.objects.filter(artist=instance).values_list("track_id", flat=True),
+            album_ids=AlbumArtist.objects.filter(artist=instance).values_list("album_id", flat=True),
+        )
+        mark_documents_dirty(artist_ids=[instance.pk])
+
+
+@receiver(pre_save, sender=Track)
+def track_moving(sender, instance: Track, update_fields: frozenset | None, **kwargs):
+    """Gets the album a track was loaded with, if it was loaded without it."""
+    if kwargs.get("raw") or instance._state.adding or hasattr(instance, "saved_album_id"):
+        return
+    if update_fields is None or {"album", "album_id"} & update_fields:
+        instance.saved_album_id = Track.objects.filter(pk=instance.pk).values_list("album_id", flat=True).first()
+
+
+@receiver(post_save, sender=Track)
+def track_saved(sender, instance: Track, created: bool, update_fields: frozenset | None, **kwargs):
+    if not kwargs.get("raw") and (update_fields is None or {"album", "album_id"} & update_fields):
+        # The album it was moved away from needs a refresh too:
+        old_album_id = None if created else getattr(instance, "saved_album_id", None)
+        if old_album_id is not None and old_album_id != instance.album_id:
+            mark_dirty(album_ids=[old_album_id])
+        instance.saved_album_id = instance.album_id
+    if not kwargs.get("raw") and (update_fields is None or {"album", "album_id", "play_count"} & update_fields):
+        mark_dirty(track_ids=[instance.pk])
+    if not kwargs.get("raw") and (update_fields is None or {"title", "year", "album", "album_id"} & update_fields):
+        mark_documents_dirty(track_ids=[instance.pk])
+
+
+@receiver(post_delete, sender=Track)
+def track_deleted(sender, instance: Track, **kwargs):
+    # Artists are taken care of by the deletion of the track's credits.
+    if instance.album_id is not None:
+        mark_dirty(album_ids=[instance.album_id])
+    # Its genre links are deleted without m2m_changed:
+    invalidate_genre_choices(Track)
+
+
+@receiver(post_save, sender=Album)
+def album_saved(sender, instance: Album, created: bool, update_fields: frozenset | None, **kwargs):
+    if created and not kwargs.get("raw"):
+        mark_dirty(album_ids=[instance.pk])
+    if not created and not kwargs.get("raw") and (update_fields is None or {"title", "year"} & update_fields):
+        mark_documents_dirty(album_ids=[instance.pk])
+
+
+@receiver(m2m_changed, sender=Track.genres.through)
+def track_genres_changed(
+    sender,
+    instance: Track | Genre,
+    action: str,
+    reverse: bool,
+    pk_set: set[int] | None,
+    **kwargs,
+):
+    # A reverse clear() doesn't say which tracks it's about, so get them
+    # beforehand:
+    if action == "pre_clear" and reverse:
+        mark_documents_dirty(track_ids=instance.tracks.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        mark_documents_dirty(track_ids=(pk_set or []) if reverse else [instance.pk])
+        invalidate_genre_choices(Track)
+
+
+@receiver(m2m_changed, sender=Album.genres.through)
+def album_genres_changed(sender, action: str, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        invalidate_genre_choices(Album)
+
+
+@receiver(post_delete, sender=Album)
+def album_deleted(sender, **kwargs):
+    invalidate_genre_choices(Album)
+
+
+@receiver(post_save, sender=Genre)
+def genre_saved(sender, instance: Genre, created: bool, **kwargs):
+    if not created and not kwargs.get("raw"):
+        mark_documents_dirty(track_ids=instance.tracks.values_list("pk", flat=True))
+        invalidate_genre_choices(Album, Track)
+
+
+@receiver(pre_delete, sender=Genre)
+def genre_deleting(sender, instance: Genre, **kwargs):
+    # The tracks' genre relations are gone without a trace after this.
+    mark_documents_dirty(track_ids=list(instance.tracks.values_list("pk", flat=True)))
+
+
+@receiver(post_delete, sender=Genre)
+def genre_deleted(sender, **kwargs):
+    invalidate_genre_choices(Album, Track)
@@ -0,0 +1,128 @@
+from collections import defaultdict
+from contextlib import AbstractContextManager
+from typing import Iterable
+
+from django.db.models import Count, Sum
+
+from recordcollection.models import (
+    Album,
+    AlbumArtist,
+    AlbumStatistics,
+    Artist,
+    ArtistStatistics,
+    Track,
+    TrackArtist,
+)
+from recordcollection.utils import DeferredRefresh, chunked, upsert_objects
+
+
+def refresh_pending(pending: defaultdict[str, set[int]]):
+    album_ids, artist_ids, track_ids = pending["albums"], pending["artists"], pending["tracks"]
+
+    for chunk in chunked(list(track_ids), 500):
+        album_ids.update(
+            Track.objects.filter(pk__in=chunk).exclude(album=None).order_by().values_list("album_id", flat=True)
+        )
+        artist_ids.update(TrackArtist.objects.filter(track_id__in=chunk).values_list("artist_id", flat=True))
+    # Album artists' play counts include the album's tracks:
+    for chunk in chunked(list(album_ids), 500):
+        artist_ids.update(AlbumArtist.objects.filter(album_id__in=chunk).values_list("artist_id", flat=True))
+
+    refresh_album_statistics(album_ids)
+    refresh_artist_statistics(artist_ids)
+
+
+refresher = DeferredRefresh(refresh_pending)
+
+
+def mark_dirty(album_ids: Iterable[int] = (), artist_ids: Iterable[int] = (), track_ids: Iterable[int] = ()):
+    """
+    Schedules statistics refreshes for these albums and artists, and for the
+    albums and artists of these tracks. They happen when the current
+    transaction commits (i.e. right away if there is none), or when the
+    outermost deferred_statistics() block exits.
+    """
+    refresher.mark(albums=album_ids, artists=artist_ids, tracks=track_ids)
+
+
+def deferred_statistics() -> AbstractContextManager[None]:
+    return refresher.deferred()
+
+
+def refresh_album_statistics(album_ids: Iterable[int]):
+    for chunk in chunked(list(album_ids), 500):
+        existing_ids = list(Album.objects.filter(pk__in=chunk).values_list("pk", flat=True))
+        counts = {
+            row["album_id"]: row
+            for row in Track.objects
+            .filter(album_id__in=existing_ids)
+            .order_by()
+            .values("album_id")
+            .annotate(track_count=Count("pk"), play_count=Sum("play_count"))
+        }
+        upsert_objects(
+            AlbumStatistics,
+            [
+                AlbumStatistics(
+                    album_id=album_id,
+                    track_count=counts[album_id]["track_count"] if album_id in counts else 0,
+                    play_count=(counts[album_id]["play_count"] or 0) if album_id in counts else 0,
+                )
+                for album_id in existing_ids
+            ],
+            unique_field="album",
+            update_fields=["track_count", "play_count"],
+        )
+
+
+def refresh_artist_statistics(artist_ids: Iterable[int]):
+    for chunk in chunked(list(artist_ids), 500):
+        existing_ids = list(Artist.objects.filter(pk__in=chunk).values_list("pk", flat=True))
+        album_counts = dict(
+            AlbumArtist.objects
+            .filter(artist_id__in=existing_ids)
+            .order_by()
+            .values("artist_id")
+            .annotate(count=Count("album_id", distinct=True))
+            .values_list("artist_id", "count")
+        )
+        track_counts = dict(
+            TrackArtist.objects
+            .filter(artist_id__in=existing_ids)
+            .order_by()
+            .values("artist_id")
+            .annotate(count=Count("track_id", distinct=True))
+            .values_list("artist_id", "count")
+        )
+        # artist id -> track id -> play count, so that a track that is both
+        # credited to the artist and on one of their albums counts once:
+        play_counts: defaultdict[int, dict[int, int]] = defaultdict(dict)
+        for artist_id, track_id, play_count in (
+            TrackArtist.objects
+            .filter(artist_id__in=existing_ids)
+            .order_by()
+            .values_list("artist_id", "track_id", "track__play_count")
+        ):
+            play_counts[artist_id][track_id] = play_count
+        for artist_id, track_id, play_count in (
+            Track.objects
+            .filter(album__album_artists__artist_id__in=existing_ids)
+            .order_by()
+            .values_list("album__album_artists__artist_id", "pk", "play_count")
+        ):
+            play_counts[artist_id][track_id] = play_count
+
+        upsert_objects(
+            ArtistStatistics,
+            [
+                ArtistStatistics(
+                    artist_id=artist_id,
+                    album_count=album_counts.get(artist_id, 0),
+                    track_count=track_counts.get(artist_id, 0),
+                    play_count=sum(play_counts[artist_id].values()),
+                )
+                for artist_id in existing_ids
+            ],
+            unique_field="artist",
+            update_fields=["album_count", "track_count", "play_count"],
+        )
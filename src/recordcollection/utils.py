@@ -1,17 +1,36 @@
 import datetime
 import os
 import re
+import threading
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from copy import deepcopy
-from typing import Any, Iterable, Iterator, Sequence, TypeVar
+from typing import Any, Callable, Iterable, Iterator, Sequence, TypeVar
 
 import dotenv
 import requests
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection, connections, models, router, transaction
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
 
 from recordcollection import __version__
-from recordcollection.models import Artist, Genre
+from recordcollection.models import (
+    Album,
+    AlbumArtist,
+    Artist,
+    Genre,
+    Track,
+    TrackArtist,
+)
 
 
 _T = TypeVar("_T")
+_R = TypeVar("_R")
 
 
 def group_and_count(seq: Iterable[_T]) -> dict[_T, int]:
@@ -91,10 +110,75 @@ def import_musicbrainz_genres():
             Genre.objects.bulk_create(new_genres, ignore_conflicts=True)
         if updated_genres:
             Genre.objects.bulk_update(updated_genres, fields=["name"])
+            invalidate_genre_choices(Album, Track)
 
 
-def delete_orphan_artists():
-    Artist.objects.filter(albums=None, tracks=None).delete()
+GENRE_CHOICES_CACHE_TIMEOUT = 60 * 60
+
+
+def get_genre_choices(model: type[Album] | type[Track]) -> list[tuple[str, str]]:
+    """
+    (id, name) of the genres that albums or tracks have, the most used ones
+    first. Cached until genres or genre links change.
+    """
+    key = f"genre-choices:{model._meta.model_name}"
+    choices = cache.get(key)
+
+    if choices is None:
+        # Counted off the index on genre_id, without joining genres:
+        counts = dict(
+            model.genres.through.objects
+            .order_by()
+            .values("genre_id")
+            .annotate(count=Count("*"))
+            .values_list("genre_id", "count")
+        )
+        genres = sorted(Genre.objects.filter(pk__in=counts), key=lambda genre: -counts[genre.pk])
+        choices = [(str(genre.pk), genre.name) for genre in genres]
+        cache.set(key, choices, GENRE_CHOICES_CACHE_TIMEOUT)
+
+    return choices
+
+
+def invalidate_genre_choices(*item_models: type[Album] | type[Track]):
+    cache.delete_many([f"genre-choices:{model._meta.model_name}" for model in item_models])
+
+
+def resolve_external_ids(
+    model: type[Album] | type[Artist] | type[Track],
+    field: str,
+    ids: Iterable[_T],
+) -> dict[_T, int]:
+    """
+    {external id: primary key} for the rows of `model` that have these ids
+    in `field` (e.g. "spotify_id"). One query per 500 ids. Where several rows
+    share an id, the one with the lowest primary key wins.
+    """
+    result: dict[_T, int] = {}
+    for chunk in chunked(list(dict.fromkeys(ids)), 500):
+        for external_id, pk in (
+            model.objects
+            .filter(**{f"{field}__in": chunk})
+            .order_by(f"-{model._meta.pk.name}")
+            .values_list(field, "pk")
+        ):
+            result[external_id] = pk
+    return result
+
+
+def delete_orphan_artists() -> dict[str, int]:
+    """Deletes artists without credits. Returns deletion counts per model."""
+    return Artist.objects.filter(
+        ~Exists(AlbumArtist.objects.filter(artist=OuterRef("pk"))),
+        ~Exists(TrackArtist.objects.filter(artist=OuterRef("pk"))),
+    ).delete()[1]
+
+
+def describe_deletion(counts: dict[str, int]) -> str:
+    """E.g. "2 albums, 31 tracks", from QuerySet.delete()'s counts."""
+    return ", ".join(
+        f"{count} {apps.get_model(label)._meta.verbose_name_plural}" for label, count in counts.items() if count
+    )
 
 
 def get_user_agent() -> str:
@@ -127,6 +211,24 @@ def merge_dicts(d1: dict, d2: dict) -> dict:
     return result
 
 
+def overlay_dicts(base: dict, overlay: dict) -> dict:
+    """
+    Like merge_dicts, but without the deep copying: only the dicts on the
+    paths that `overlay` changes are copied, everything else is shared with
+    `base`. So don't mutate either of them, or the result, afterwards.
+    """
+    if not overlay:
+        return base
+    result = dict(base)
+    for key, value in overlay.items():
+        base_value = result.get(key)
+        if isinstance(base_value, dict) and isinstance(value, dict):
+            result[key] = overlay_dicts(base_value, value)
+        else:
+            result[key] = value
+    return result
+
+
 def string_to_timedelta(s: str) -> datetime.timedelta | None:
     match = re.match(r"(?:(?P<hours>\d+):)?(?P<minutes>\d+):(?P<seconds>\d+)$", string=s)
 
@@ -150,3 +252,214 @@ def chunked(items: Sequence[_T], size: int) -> Iterator[Sequence[_T]]:
     while chunk_idx * size < len(items):
         yield items[chunk_idx * size:(chunk_idx + 1) * size]
         chunk_idx += 1
+
+
+def iterate_concurrently(
+    func: Callable[[_T], _R],
+    items: Iterable[_T],
+    max_workers: int = 4,
+    prefetch: int | None = None,
+) -> Iterator[_R]:
+    """
+    Like map(func, items), but func is run in a thread pool with up to
+    `prefetch` calls in flight ahead of the consumer. Results are still
+    yielded in the order of `items`.
+    """
+    prefetch = max(prefetch or max_workers * 2, 1)
+    futures: deque[Future[_R]] = deque()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        try:
+            for item in items:
+                futures.append(executor.submit(func, item))
+                if len(futures) >= prefetch:
+                    yield futures.popleft().result()
+            while futures:
+                yield futures.popleft().result()
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def upsert_objects(model: type[models.Model], objs: list, unique_field: str, update_fields: list[str]):
+    model.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=[unique_field] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=update_fields,
+        batch_size=500,
+    )
+
+
+class DeferredRefresh:
+    """
+    Collects ids of things that need refreshing, per thread and per kind, and
+    passes them to `refresh` as {kind: ids} when the current transaction
+    commits (i.e. right away if there is none), or when the outermost
+    deferred() block exits.
+    """
+    def __init__(self, refresh: Callable[[defaultdict[str, set[int]]], None]):
+        self.refresh = refresh
+        self.local = threading.local()
+
+    def get_pending(self) -> defaultdict[str, set[int]]:
+        if not hasattr(self.local, "pending"):
+            self.local.pending = defaultdict(set)
+            self.local.deferred = 0
+        return self.local.pending
+
+    def mark(self, **ids: Iterable[int]):
+        pending = self.get_pending()
+        for kind, kind_ids in ids.items():
+            pending[kind].update(kind_ids)
+        if not self.local.deferred:
+            # Once there's nothing left, further callbacks are no-ops:
+            transaction.on_commit(self.flush)
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """Collects refreshes from e.g. an import, and does them at the end."""
+        self.get_pending()
+        self.local.deferred += 1
+        try:
+            yield
+        finally:
+            self.local.deferred -= 1
+            if not self.local.deferred:
+                self.flush()
+
+    def flush(self):
+        pending = self.get_pending()
+        self.local.pending = defaultdict(set)
+        if any(pending.values()):
+            self.refresh(pending)
+
+
+class StagedValues:
+    def __init__(self, table: str, model: type[models.Model], field_name: str, using: str):
+        self.table = table
+        self.model = model
+        self.field_name = field_name
+        self.using = using
+
+    def matches(self) -> RawSQL:
+        """
+        EXISTS (...) for the rows of the model whose field is among the staged
+        values, to filter() or exclude() the model's querysets with. These
+        have to run on the `using` database, as the table only exists there.
+        """
+        qn = connections[self.using].ops.quote_name
+        column = f"{qn(self.model._meta.db_table)}.{qn(self.model._meta.get_field(self.field_name).column)}"
+        return RawSQL(
+            f"EXISTS (SELECT 1 FROM {qn(self.table)} WHERE {qn(self.table)}.value = {column})",
+            [],
+            output_field=models.BooleanField(),
+        )
+
+
+@contextmanager
+def staged_values(
+    model: type[models.Model],
+    field_name: str,
+    values: Iterable | QuerySet,
+    using: str | None = None,
+) -> Iterator[StagedValues]:
+    """
+    Stages `values` for `model`'s field in an indexed temporary table, for
+    (anti-)joins with sets of values too big to pass as query parameters.
+    A `values_list()` queryset of one column is copied over in the database.
+    The table is dropped on exit.
+
+    The table is created in the `using` database, which defaults to the one
+    the model is written to, so that deletes and updates can use it.
+    """
+    if using is None:
+        using = router.db_for_write(model)
+    db_connection = connections[using]
+    qn = db_connection.ops.quote_name
+    table = f"staged_{uuid.uuid4().hex[:16]}"
+    db_type = model._meta.get_field(field_name).rel_db_type(db_connection)
+
+    with db_connection.cursor() as cursor:
+        cursor.execute(f"CREATE TEMPORARY TABLE {qn(table)} (value {db_type})")
+        try:
+            if isinstance(values, QuerySet):
+                sql, params = values.query.get_compiler(connection=db_connection).as_sql()
+                cursor.execute(f"INSERT INTO {qn(table)} (value) {sql}", params)
+            else:
+                for chunk in chunked(list(values), 500):
+                    cursor.executemany(f"INSERT INTO {qn(table)} (value) VALUES (%s)", [(value,) for value in chunk])
+            cursor.execute(f"CREATE INDEX {qn(table + '_value')} ON {qn(table)} (value)")
+            yield StagedValues(table, model, field_name, using)
+        finally:
+            cursor.execute(f"DROP TABLE {qn(table)}")
+
+
+class AhoCorasick:
+    """
+    Finds which of a (possibly large) number of patterns occur in a text, in
+    a single pass over the text. Matching is case insensitive. With
+    `wholewords`, a pattern only matches where it isn't directly preceded or
+    followed by a word character.
+    """
+    def __init__(self, patterns: Iterable[str], wholewords: bool = False):
+        self.patterns = [pattern.casefold() for pattern in patterns]
+        self.wholewords = wholewords
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        # Indexes of the patterns that end in each state, including those
+        # reached through fail links:
+        self.outputs: list[list[int]] = [[]]
+
+        for idx, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.outputs[state].append(idx)
+
+        # Breadth first, so that the fail state (which is shallower) of each
+        # state is finished before the state itself:
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fail = self.fail[state]
+                while fail and char not in self.goto[fail]:
+                    fail = self.fail[fail]
+                self.fail[next_state] = self.goto[fail].get(char, 0)
+                self.outputs[next_state].extend(self.outputs[self.fail[next_state]])
+
+    def find(self, text: str) -> set[int]:
+        """Indexes of the patterns that occur in `text`."""
+        text = text.casefold()
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        found: set[int] = set()
+        state = 0
+
+        for end, char in enumerate(text, start=1):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if outputs[state]:
+                if not self.wholewords:
+                    found.update(outputs[state])
+                elif end == len(text) or not is_word_char(text[end]):
+                    found.update(
+                        idx for idx in outputs[state]
+                        if end == len(self.patterns[idx]) or not is_word_char(text[end - len(self.patterns[idx]) - 1])
+                    )
+
+        return found
+
+
+def is_word_char(char: str) -> bool:
+    """Same as regex \\w."""
+    return char.isalnum() or char == "_"
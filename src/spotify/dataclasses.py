@@ -9,7 +9,11 @@ from country_list import available_languages, countries_for_language
 from django.db.models import Q
 from django.db.models.functions import Lower
 
-from recordcollection.abstract_classes import AbstractBaseRecord
+from recordcollection.abstract_classes import (
+    AbstractBaseRecord,
+    slotted_dataclass,
+)
+from recordcollection.artist_fields import deferred_artist_fields
 from recordcollection.models import (
     Album,
     AlbumArtist,
@@ -22,7 +26,7 @@ from spotify.abstract_classes import AbstractSpotifyResponse
 from spotify.request import get_spotify_response
 
 
-@dataclass
+@slotted_dataclass
 class SpotifyArtist(AbstractBaseRecord):
     id: str
     name: str
@@ -37,14 +41,14 @@ class SpotifyArtist(AbstractBaseRecord):
         return Artist.iupdate_or_create(name=self.name, spotify_id=self.id)
 
 
-@dataclass
+@slotted_dataclass(frozen=True)
 class SpotifyImage(AbstractBaseRecord):
     height: int
     url: str
     width: int
 
 
-@dataclass
+@slotted_dataclass
 class SpotifySimplifiedTrack(AbstractBaseRecord):
     artists: list[SpotifyArtist]
     disc_number: int
@@ -89,7 +93,7 @@ class SpotifySimplifiedTrack(AbstractBaseRecord):
         return track
 
 
-@dataclass
+@slotted_dataclass
 class SpotifyTrack(SpotifySimplifiedTrack):
     album: "SpotifySimplifiedAlbum"
     available_markets: list[str] | None = None
@@ -125,7 +129,7 @@ class SpotifyTrack(SpotifySimplifiedTrack):
         return sorted(markets, key=lambda m: m.code if codeorder else m.name or m.code)
 
 
-@dataclass
+@slotted_dataclass
 class SpotifySimplifiedAlbum(AbstractBaseRecord):
     album_type: Literal["album", "single", "compilation"]
     artists: list[SpotifyArtist]
@@ -146,9 +150,9 @@ class SpotifySimplifiedAlbum(AbstractBaseRecord):
         return super().serialize_field(key, value)
 
 
-@dataclass
+@slotted_dataclass
 class SpotifyAlbum(SpotifySimplifiedAlbum):
-    @dataclass
+    @slotted_dataclass
     class Tracks(AbstractBaseRecord):
         items: list[SpotifySimplifiedTrack]
         limit: int
@@ -172,6 +176,7 @@ class SpotifyAlbum(SpotifySimplifiedAlbum):
             return cls.Tracks.from_dict(value)
         return super().serialize_field(key, value)
 
+    @deferred_artist_fields()
     def to_album(self) -> Album:
         year_match = re.match(r"^(\d{4})", self.release_date)
         year = int(year_match.group(1)) if year_match else None
@@ -180,14 +185,14 @@ class SpotifyAlbum(SpotifySimplifiedAlbum):
 
         album_qs = Album.objects.filter(
             Q(spotify_id=None) | Q(spotify_id=self.id),
-            title__iexact=self.name,
+            title__ciexact=self.name,
             medium=Album.Medium.STREAMING,
         )
         if is_compilation:
             album_qs = album_qs.filter(is_compilation=True)
         elif artist_names:
             album_qs = album_qs.filter(
-                functools.reduce(operator.or_, [Q(artists__name__iexact=name) for name in artist_names], Q())
+                functools.reduce(operator.or_, [Q(artists__name__ciexact=name) for name in artist_names], Q())
             )
 
         album = album_qs.first()
@@ -236,7 +241,7 @@ class SpotifyAlbum(SpotifySimplifiedAlbum):
         return album
 
 
-@dataclass
+@slotted_dataclass
 class SpotifyUserAlbum(AbstractBaseRecord):
     album: SpotifyAlbum
     added_at: datetime.datetime
@@ -262,3 +267,24 @@ class SpotifyUserAlbumsResponse(AbstractSpotifyResponse[SpotifyUserAlbum]):
     @classmethod
     def serialize_item(cls, value: Any) -> SpotifyUserAlbum:
         return SpotifyUserAlbum.from_dict(value)
+
+
+@slotted_dataclass
+class SpotifyPlaylistItem(AbstractBaseRecord):
+    track: SpotifyTrack | None = None
+
+    @classmethod
+    def serialize_field(cls, key: str, value: Any):
+        if key == "track":
+            # Skip episodes and local files:
+            if value and value.get("type") == "track" and value.get("id"):
+                return SpotifyTrack.from_dict(value)
+            return None
+        return super().serialize_field(key, value)
+
+
+@dataclass
+class SpotifyPlaylistItemsResponse(AbstractSpotifyResponse[SpotifyPlaylistItem]):
+    @classmethod
+    def serialize_item(cls, value: Any) -> SpotifyPlaylistItem:
+        return SpotifyPlaylistItem.from_dict(value)
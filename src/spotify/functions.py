@@ -3,7 +3,10 @@ from collections.abc import Iterator
 
 from spotify.dataclasses import (
     SpotifyAlbum,
+    SpotifyPlaylistItemsResponse,
+    SpotifySimplifiedTrack,
     SpotifyTrack,
+    SpotifyTracksResponse,
     SpotifyUserAlbumsResponse,
 )
 from spotify.request import get_spotify_response, spotify_get
@@ -36,6 +39,32 @@ def get_spotify_album(album_id: str) -> SpotifyAlbum:
     return SpotifyAlbum.from_dict(response.json())
 
 
+def get_spotify_album_tracks(album_id_or_link: str) -> tuple[SpotifyAlbum, list[SpotifySimplifiedTrack]]:
+    album = get_spotify_album(get_spotify_id(album_id_or_link, "album"))
+    tracks = list(album.tracks.items)
+    uri = album.tracks.next
+
+    while uri is not None:
+        response = get_spotify_response(url=uri, response_type=SpotifyTracksResponse)
+        tracks.extend(response.items)
+        uri = response.next
+
+    return album, tracks
+
+
+def get_spotify_playlist_tracks(playlist_id_or_link: str) -> list[SpotifyTrack]:
+    playlist_id = get_spotify_id(playlist_id_or_link, "playlist")
+    tracks = []
+    uri: str | None = f"https://api.spotify.com/v1/playlists/{playlist_id}/tracks?limit=100"
+
+    while uri is not None:
+        response = get_spotify_response(url=uri, response_type=SpotifyPlaylistItemsResponse)
+        tracks.extend([item.track for item in response.items if item.track is not None])
+        uri = response.next
+
+    return tracks
+
+
 def get_spotify_track(track_id_or_link: str) -> SpotifyTrack:
     track_id: str
     if is_spotify_track_link(track_id_or_link):
@@ -56,3 +85,13 @@ def get_spotify_track_id_from_link(link: str) -> str:
     if match:
         return match.group(1)
     raise ValueError(f"Not a valid Spotify track link: {link}")
+
+
+def get_spotify_id(id_or_link: str, kind: str) -> str:
+    """Takes an ID or an open.spotify.com link to a track, album etc."""
+    if id_or_link.startswith(f"https://open.spotify.com/{kind}/"):
+        match = re.match(rf"^https://open.spotify.com/{kind}/([^?]*).*$", string=id_or_link)
+        if match:
+            return match.group(1)
+        raise ValueError(f"Not a valid Spotify {kind} link: {id_or_link}")
+    return id_or_link
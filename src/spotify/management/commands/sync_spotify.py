@@ -4,11 +4,15 @@ import math
 from django.core.management.base import BaseCommand, CommandParser
 
 from recordcollection.models import Album
+from recordcollection.search import deferred_search_index
+from recordcollection.statistics import deferred_statistics
 from recordcollection.utils import (
     delete_orphan_artists,
+    describe_deletion,
     get_env_datetime,
     import_musicbrainz_genres,
     set_env_datetime,
+    staged_values,
 )
 from spotify.dataclasses import SpotifyAlbum, SpotifyUserAlbumsResponse
 from spotify.request import get_spotify_response
@@ -23,28 +27,34 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         self.last_sync = get_env_datetime("LAST_SPOTIFY_SYNC")
-        album_ids = list(Album.objects.exclude(spotify_id=None).values_list("spotify_id", flat=True))
-        total = options["total"] is True
+        existing_album_ids = set(
+            Album.objects.filter(spotify_id__isnull=False).order_by().values_list("spotify_id", flat=True)
+        )
+        # Orphan detection needs the whole library, not just the newest:
+        total = options["total"] is True or options["delete"] is True
 
         import_musicbrainz_genres()
         user_albums = self.get_user_albums(total)
-        if not total:
-            user_albums = [a for a in user_albums if a.id not in album_ids]
+        album_ids = {a.id for a in user_albums}
+        if not options["total"]:
+            user_albums = [a for a in user_albums if a.id not in existing_album_ids]
 
-        for idx, spotify_album in enumerate(user_albums):
-            album_ids.append(spotify_album.id)
-            album = spotify_album.to_album()
-            album = album.update_from_musicbrainz()
-            print(f"[{idx + 1}/{len(user_albums)}] {album}")
+        with deferred_statistics(), deferred_search_index():
+            for idx, spotify_album in enumerate(user_albums):
+                album = spotify_album.to_album()
+                album = album.update_from_musicbrainz()
+                print(f"[{idx + 1}/{len(user_albums)}] {album}")
 
-        if options["delete"]:
-            orphans = Album.objects.exclude(spotify_id=None).exclude(spotify_id__in=album_ids)
-            if orphans:
-                self.stdout.write(f"Deleting {orphans.count()} orphan albums.")
-                orphans.delete()
+            if options["delete"]:
+                with staged_values(Album, "spotify_id", album_ids) as spotify_ids:
+                    deleted = Album.objects.filter(spotify_id__isnull=False).exclude(spotify_ids.matches()).delete()[1]
+                if any(deleted.values()):
+                    self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
 
-        set_env_datetime("LAST_SPOTIFY_SYNC")
-        delete_orphan_artists()
+            set_env_datetime("LAST_SPOTIFY_SYNC")
+            deleted = delete_orphan_artists()
+            if any(deleted.values()):
+                self.stdout.write(f"Deleted orphans: {describe_deletion(deleted)}.")
 
     def get_user_albums(self, total: bool = False) -> list[SpotifyAlbum]:
         albums = []
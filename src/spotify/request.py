@@ -94,7 +94,7 @@ def authorize():
     client_id = os.environ.get("SPOTIFY_CLIENT_ID")
     url = (
         f"https://accounts.spotify.com/authorize?client_id={client_id}&response_type=code"
-        f"&redirect_uri={REDIRECT_URI}&scope=user-library-read"
+        f"&redirect_uri={REDIRECT_URI}&scope=user-library-read%20playlist-read-private"
     )
     webbrowser.open_new_tab(url)
     with HTTPServer((REDIRECT_HOST, REDIRECT_PORT), AuthCallbackHandler) as httpd:
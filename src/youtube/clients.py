@@ -1,10 +1,20 @@
+import hashlib
+import json
 import re
+import time
 from abc import ABC, abstractmethod
+from functools import cached_property
 from typing import Any, Iterator
+from urllib.parse import parse_qs, urlparse
 
 import requests
+from django.core.cache import cache
 
-from recordcollection.utils import merge_dicts, string_to_timedelta
+from recordcollection.utils import (
+    merge_dicts,
+    overlay_dicts,
+    string_to_timedelta,
+)
 from youtube.dataclasses import YoutubeMetadata, YoutubeVideo
 
 
@@ -14,6 +24,43 @@ RESULTS_URL = "https://www.youtube.com/results"
 SEARCH_URL = "https://www.youtube.com/youtubei/v1/search"
 VIDEO_MIMETYPE_FILTER = r"^audio/.*$"
 VIDEO_MIMETYPE_PREFERRED = ["audio/opus"]
+YT_INITIAL_DATA_ASSIGNMENT = re.compile(r"var ytInitialData\s*=\s*([{'])")
+JS_STRING = re.compile(r"'((?:[^'\\]+|\\.)*)'", flags=re.DOTALL)
+JS_ESCAPE = re.compile(r"\\(?:x([0-9a-fA-F]{2})|u\{([0-9a-fA-F]+)\}|u([0-9a-fA-F]{4})|(\r\n|.))", flags=re.DOTALL)
+JS_SINGLE_CHAR_ESCAPES = {
+    "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t", "v": "\v", "0": "\0",
+    # Line continuations:
+    "\n": "", "\r": "", "\r\n": "", "\u2028": "", "\u2029": "",
+}
+SURROGATE = re.compile("[\ud800-\udfff]")
+JSON_DECODER = json.JSONDecoder()
+SEARCH_CACHE_TIMEOUT = 24 * 60 * 60
+# Stream URLs must still be usable for a download started right before the
+# cached metadata expires:
+METADATA_CACHE_MARGIN = 30 * 60
+
+
+def decode_js_string(value: str) -> str:
+    """The contents of a JavaScript string literal, with escapes decoded."""
+    def replace(match: re.Match) -> str:
+        hex_code = match.group(1) or match.group(2) or match.group(3)
+        if hex_code is not None:
+            return chr(int(hex_code, 16))
+        return JS_SINGLE_CHAR_ESCAPES.get(match.group(4), match.group(4))
+
+    value = JS_ESCAPE.sub(replace, value)
+    if SURROGATE.search(value):
+        # Characters outside the BMP come as \uXXXX\uXXXX surrogate pairs:
+        value = value.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+    return value
+
+
+def get_stream_url_expiry(url: str) -> int | None:
+    """Unix timestamp from the "expire" parameter of a stream URL, if any."""
+    try:
+        return int(parse_qs(urlparse(url).query)["expire"][0])
+    except (KeyError, ValueError):
+        return None
 
 
 class AbstractYoutubeClient(ABC):
@@ -30,8 +77,13 @@ class AbstractYoutubeClient(ABC):
     def get_video_renderers(self, response: dict[str, Any]) -> Iterator[dict]:
         ...
 
-    def get_json(self, video_id: str | None = None) -> dict[str, Any]:
-        d = {
+    @cached_property
+    def base_json(self) -> dict[str, Any]:
+        """Static part of the request body, shared by all requests."""
+        return self.get_base_json()
+
+    def get_base_json(self) -> dict[str, Any]:
+        return {
             "contentCheckOk": True,
             "context": {
                 "client": {
@@ -56,9 +108,12 @@ class AbstractYoutubeClient(ABC):
                 "lockedSafetyMode": False,
             },
         }
+
+    def get_json(self, video_id: str | None = None) -> dict[str, Any]:
+        """Not a copy, so don't mutate it."""
         if video_id:
-            d["videoId"] = video_id
-        return d
+            return {**self.base_json, "videoId": video_id}
+        return self.base_json
 
     def get_headers(self, video_id: str | None = None) -> dict[str, str]:
         d = {
@@ -93,7 +148,7 @@ class AbstractYoutubeClient(ABC):
         return requests.post(
             url=url,
             headers={**self.get_headers(video_id), **headers},
-            json=merge_dicts(self.get_json(video_id), json),
+            json=overlay_dicts(self.get_json(video_id), json),
             params={**self.get_params(video_id), **params},
             timeout=10,
         ).json()
@@ -122,9 +177,29 @@ class AbstractYoutubeClient(ABC):
             if metadatas:
                 return max(metadatas, key=lambda m: m.quality)
         metadatas = [m for m in metadata_list if re.match(VIDEO_MIMETYPE_FILTER, m.mime_type)]
-        return max(metadatas, key=lambda m: m.quality)
+        if metadatas:
+            return max(metadatas, key=lambda m: m.quality)
+        return None
 
     def get_metadata(self, video_id: str) -> list[YoutubeMetadata]:
+        """
+        Cached until shortly before the first of the stream URLs expires. If
+        any of them lacks an expiry, nothing is cached.
+        """
+        cache_key = f"youtube:metadata:{self.client_name}:{video_id}"
+        metadata_list: list[YoutubeMetadata] | None = cache.get(cache_key)
+
+        if metadata_list is None:
+            metadata_list = self.fetch_metadata(video_id)
+            expiries = [get_stream_url_expiry(m.url) for m in metadata_list]
+            if expiries and None not in expiries:
+                timeout = min(e for e in expiries if e is not None) - int(time.time()) - METADATA_CACHE_MARGIN
+                if timeout > 0:
+                    cache.set(cache_key, metadata_list, timeout)
+
+        return metadata_list
+
+    def fetch_metadata(self, video_id: str) -> list[YoutubeMetadata]:
         response = self.post_json(url=PLAYER_URL, video_id=video_id)
         formats: list[dict] = response.get("streamingData", {}).get("formats", []) or []
         adaptive_formats: list[dict] = response.get("streamingData", {}).get("adaptiveFormats", []) or []
@@ -169,15 +244,59 @@ class AbstractYoutubeClient(ABC):
                     yield content2.get("playlistVideoRenderer", {})
 
     def extract_yt_initial_data(self, body: str) -> str | None:
-        matches = re.findall(r"var ytInitialData *= *(\{.*?\});", body, flags=re.MULTILINE)
-        if matches:
-            return matches[-1]
-        matches = re.findall(r"var ytInitialData *= *'(\\x7b.*?\\x7d)'", body, flags=re.MULTILINE)
-        if matches:
-            return re.sub(r"\\x(..)", lambda m: chr(int(m.group(0), base=16)), matches[-1])
-        return None
+        """
+        The JSON assigned to the last ytInitialData variable in the page, which
+        is either an object literal or a string literal with \\xNN escapes.
+        Since an inline script can't contain "</script>", the assignment
+        normally ends right before the first one following it. If that's not
+        clear cut (e.g. there's another statement after it), the end is found
+        by decoding the object or matching the string instead.
+        """
+        start = body.rfind("var ytInitialData")
+        if start == -1:
+            return None
+        match = YT_INITIAL_DATA_ASSIGNMENT.match(body, start)
+        if match is None:
+            return None
+        value_start = match.start(1)
+        script_end = body.find("</script>", value_start)
+        value = body[value_start:script_end if script_end != -1 else len(body)].rstrip().rstrip(";").rstrip()
+
+        if match.group(1) == "{":
+            if value.endswith("}") and body.find("};", value_start) == value_start + len(value) - 1:
+                return value
+            try:
+                _, end = JSON_DECODER.raw_decode(body, value_start)
+            except ValueError:
+                return None
+            return body[value_start:end]
+
+        if value.find("'", 1) == len(value) - 1 > 0:
+            value = value[1:-1]
+        else:
+            string_match = JS_STRING.match(body, value_start)
+            if string_match is None:
+                return None
+            value = string_match.group(1)
+        if "\\" in value:
+            value = decode_js_string(value)
+        return value
 
     def get_video_search_results(self, query: str) -> list[YoutubeVideo]:
+        normalized_query = " ".join(query.casefold().split())
+        query_hash = hashlib.sha1(normalized_query.encode()).hexdigest()
+        cache_key = f"youtube:search:{self.client_name}:{self.region}:{query_hash}"
+        videos: list[YoutubeVideo] | None = cache.get(cache_key)
+
+        if videos is None:
+            videos = self.fetch_video_search_results(query)
+            # An empty result could just as well be an error response:
+            if videos:
+                cache.set(cache_key, videos, SEARCH_CACHE_TIMEOUT)
+
+        return videos
+
+    def fetch_video_search_results(self, query: str) -> list[YoutubeVideo]:
         json = {"query": query}
         response = self.post_json(url=SEARCH_URL, json=json)
         videos: list[YoutubeVideo] = []
@@ -237,9 +356,9 @@ class AbstractYoutubeAndroidClient(AbstractYoutubeClient, ABC):
             for content2 in content.get("itemSectionRenderer", {}).get("contents", []) or []:
                 yield content2.get("compactVideoRenderer", {})
 
-    def get_json(self, video_id: str | None = None) -> dict[str, Any]:
+    def get_base_json(self) -> dict[str, Any]:
         return merge_dicts(
-            super().get_json(video_id),
+            super().get_base_json(),
             {
                 "context": {
                     "client": {
@@ -25,24 +25,46 @@ class YoutubeVideo(AbstractBaseRecord):
     def web_url(self) -> str:
         return f"https://youtu.be/{self.id}"
 
-    def match_spotify_track(self, spotify_track: SpotifyTrack) -> float:
-        """Scale 0.0 - 1.0, the higher the better match."""
-        matched_artists = [
-            artist.name for artist in spotify_track.artists
-            if artist.name.lower() in self.title.lower()
-        ]
+    def get_name_score(self, title: str, artist_names: list[str]) -> float:
+        """
+        Scale 0.0 - 1.0. The title and artist part of the match score, which
+        doesn't need metadata. The full score can never be higher than this.
+        """
+        matched_artists = [name for name in artist_names if name.lower() in self.title.lower()]
         stripped_title = self.title
         for artist in matched_artists:
-            stripped_title = re.sub(rf"[ ,\-&]*{artist}[ ,\-&]*", "", stripped_title, flags=re.IGNORECASE)
-        title_score = Levenshtein.ratio(stripped_title.strip().lower(), spotify_track.name.lower())
-        artist_score = float(len(matched_artists)) / len(spotify_track.artists)
-        if self.metadata:
-            ms_diff = abs(spotify_track.duration_ms - self.metadata.duration_ms)
-            ms_diff_ratio = ms_diff / spotify_track.duration_ms
-            duration_score = max(1.0 - ms_diff_ratio, 0.0)
-            return ((title_score + artist_score) / 2) * duration_score
+            stripped_title = re.sub(
+                rf"[ ,\-&]*{re.escape(artist)}[ ,\-&]*",
+                "",
+                stripped_title,
+                flags=re.IGNORECASE,
+            )
+        title_score = Levenshtein.ratio(stripped_title.strip().lower(), title.lower())
+        if not artist_names:
+            return title_score
+        artist_score = float(len(matched_artists)) / len(artist_names)
         return (title_score + artist_score) / 2
 
+    def get_spotify_track_name_score(self, spotify_track: SpotifyTrack) -> float:
+        return self.get_name_score(spotify_track.name, [artist.name for artist in spotify_track.artists])
+
+    def match(self, title: str, artist_names: list[str], duration_ms: int | None = None) -> float:
+        """Scale 0.0 - 1.0, the higher the better match."""
+        name_score = self.get_name_score(title, artist_names)
+        if self.metadata and duration_ms:
+            ms_diff = abs(duration_ms - self.metadata.duration_ms)
+            ms_diff_ratio = ms_diff / duration_ms
+            duration_score = max(1.0 - ms_diff_ratio, 0.0)
+            return name_score * duration_score
+        return name_score
+
+    def match_spotify_track(self, spotify_track: SpotifyTrack) -> float:
+        return self.match(
+            title=spotify_track.name,
+            artist_names=[artist.name for artist in spotify_track.artists],
+            duration_ms=spotify_track.duration_ms,
+        )
+
 
 @dataclass
 class YoutubeMetadata(AbstractBaseRecord):
@@ -0,0 +1,328 @@
+import dataclasses
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+from urllib.parse import urlparse
+
+import requests
+
+from recordcollection.models import Track
+from recordcollection.utils import iterate_concurrently, sanitize_filename
+from spotify.dataclasses import SpotifySimplifiedTrack
+from youtube.clients import (
+    PLAYER_URL,
+    SEARCH_URL,
+    YoutubeAndroidTestSuiteClient,
+    YoutubeWebClient,
+)
+from youtube.dataclasses import YoutubeVideo
+
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_STATE_SAVE_INTERVAL = 1024 * 1024
+MATCH_THRESHOLD = 0.9
+
+
+@dataclass
+class DownloadResult:
+    path: Path
+    size: int
+    downloaded: int
+    seconds: float
+
+    @property
+    def mb_per_second(self) -> float:
+        return (self.downloaded / 1_000_000) / self.seconds if self.seconds > 0 else 0.0
+
+
+class HostLimiter:
+    """Caps the number of concurrent requests to any one host."""
+    def __init__(self, per_host: int = 4):
+        self.per_host = per_host
+        self.lock = threading.Lock()
+        self.semaphores: dict[str, threading.BoundedSemaphore] = {}
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.per_host)
+            semaphore = self.semaphores[host]
+        with semaphore:
+            yield
+
+
+class RangedDownload:
+    """
+    Downloads `url` to `path` by way of "<path>.part", using `segments`
+    parallel HTTP Range requests if the server supports them. Segment progress
+    is kept in "<path>.part.json", so an interrupted download is resumed on
+    the next try (even with a new URL, as long as the size is the same). The
+    file is only moved into place once it's complete. With a `limiter`, every
+    request takes a slot for the host the URL redirects to.
+
+    Ranges are [start, end, bytes written, bytes synced]. Only synced bytes
+    (flushed and fsynced to the .part file) are saved as progress, so that a
+    resume after a hard kill never skips bytes that were still buffered.
+    """
+    def __init__(self, url: str, path: Path, segments: int = 4, limiter: HostLimiter | None = None):
+        self.url = url
+        # Set to where `url` redirects to by the first request:
+        self.media_url = url
+        self.limiter = limiter
+        self.path = path
+        self.segments = max(segments, 1)
+        self.temp_path = path.with_name(path.name + ".part")
+        self.state_path = path.with_name(path.name + ".part.json")
+        self.lock = threading.Lock()
+        self.progress: Callable[[int, int | None], None] | None = None
+        self.ranges: list[list[int]] = []
+        self.downloaded = 0
+
+    @contextmanager
+    def limit(self) -> Iterator[None]:
+        if self.limiter is None:
+            yield
+        else:
+            with self.limiter.limit(self.media_url):
+                yield
+
+    @property
+    def done(self) -> int:
+        return sum(r[2] for r in self.ranges)
+
+    def run(self, progress: Callable[[int, int | None], None] | None = None) -> DownloadResult:
+        """`progress` gets called with (bytes done, total bytes)."""
+        self.progress = progress
+        started = time.monotonic()
+        size = self.get_ranged_size()
+
+        if size is None:
+            size = self.download_whole()
+        else:
+            self.download_ranges(size)
+
+        os.replace(self.temp_path, self.path)
+        self.state_path.unlink(missing_ok=True)
+        return DownloadResult(
+            path=self.path,
+            size=size,
+            downloaded=self.downloaded,
+            seconds=time.monotonic() - started,
+        )
+
+    def get_ranged_size(self) -> int | None:
+        """Total size if the server does Range requests, otherwise None."""
+        # Only the host of the original URL is known before this request:
+        with self.limit(), requests.get(self.url, headers={"Range": "bytes=0-0"}, stream=True, timeout=10) as response:
+            self.media_url = response.url
+            content_range = response.headers.get("Content-Range", "")
+            match = re.match(r"^bytes 0-0/(\d+)$", content_range)
+            if response.status_code == 206 and match:
+                return int(match.group(1))
+        return None
+
+    def download_whole(self) -> int:
+        with self.limit(), requests.get(self.url, stream=True, timeout=10) as response:
+            response.raise_for_status()
+            length = int(response.headers["Content-Length"]) if "Content-Length" in response.headers else None
+            self.ranges = [[0, (length or 0) - 1, 0, 0]]
+            with self.temp_path.open("wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    self.add_progress(self.ranges[0], len(chunk), length)
+        return self.done
+
+    def download_ranges(self, size: int):
+        self.load_state(size)
+
+        if not self.temp_path.exists() or not self.ranges:
+            segment_size = -(-size // self.segments)
+            self.ranges = [
+                [start, min(start + segment_size, size) - 1, 0, 0]
+                for start in range(0, size, segment_size)
+            ]
+            with self.temp_path.open("wb") as f:
+                f.truncate(size)
+
+        try:
+            # Leaving the executor waits for all segments, whose files are
+            # then synced and closed:
+            with ThreadPoolExecutor(max_workers=len(self.ranges)) as executor:
+                futures = [executor.submit(self.download_range, r, size) for r in self.ranges]
+                for future in futures:
+                    future.result()
+        finally:
+            with self.lock:
+                self.save_state(size)
+
+        if self.done != size:
+            raise IOError(f"Download incomplete: got {self.done} of {size} bytes")
+
+    def download_range(self, byte_range: list[int], size: int):
+        start, end, done, _ = byte_range
+        if start + done > end:
+            return
+
+        headers = {"Range": f"bytes={start + done}-{end}"}
+        with self.limit(), requests.get(self.url, headers=headers, stream=True, timeout=10) as response:
+            if response.status_code != 206:
+                raise IOError(f"Expected partial content, got HTTP {response.status_code}")
+            with self.temp_path.open("r+b") as f:
+                f.seek(start + done)
+                try:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        chunk = chunk[:end + 1 - start - byte_range[2]]
+                        f.write(chunk)
+                        self.add_progress(byte_range, len(chunk), size)
+                        if byte_range[2] - byte_range[3] >= DOWNLOAD_STATE_SAVE_INTERVAL:
+                            self.sync_range(f, byte_range, size)
+                finally:
+                    self.sync_range(f, byte_range, size)
+
+    def sync_range(self, f: BinaryIO, byte_range: list[int], size: int):
+        """Syncs the bytes written to the range, and saves them as progress."""
+        f.flush()
+        os.fsync(f.fileno())
+        with self.lock:
+            byte_range[3] = byte_range[2]
+            self.save_state(size)
+
+    def add_progress(self, byte_range: list[int], length: int, size: int | None):
+        with self.lock:
+            byte_range[2] += length
+            self.downloaded += length
+            if self.progress:
+                self.progress(self.done, size)
+
+    def load_state(self, size: int):
+        try:
+            state = json.loads(self.state_path.read_text())
+            if state["size"] == size:
+                self.ranges = [[start, end, synced, synced] for start, end, synced in state["ranges"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.ranges = []
+
+    def save_state(self, size: int):
+        ranges = [[start, end, synced] for start, end, _, synced in self.ranges]
+        self.state_path.write_text(json.dumps({"size": size, "ranges": ranges}))
+
+
+def download_file(
+    url: str,
+    path: Path,
+    segments: int = 4,
+    progress: Callable[[int, int | None], None] | None = None,
+    limiter: HostLimiter | None = None,
+) -> DownloadResult:
+    return RangedDownload(url=url, path=path, segments=segments, limiter=limiter).run(progress=progress)
+
+
+@dataclass
+class DownloadJob:
+    title: str
+    artist_names: list[str]
+    duration_ms: int | None = None
+    track_id: int | None = None
+
+    def __str__(self):
+        return f"{self.artist_string} - {self.title}" if self.artist_string else self.title
+
+    @property
+    def artist_string(self) -> str:
+        return " / ".join(self.artist_names)
+
+    @classmethod
+    def from_spotify_track(cls, spotify_track: SpotifySimplifiedTrack, track_id: int | None = None) -> "DownloadJob":
+        return cls(
+            title=spotify_track.name,
+            artist_names=[artist.name for artist in spotify_track.artists],
+            duration_ms=spotify_track.duration_ms,
+            track_id=track_id,
+        )
+
+    @classmethod
+    def from_track(cls, track: Track) -> "DownloadJob":
+        return cls(
+            title=track.title,
+            artist_names=[track_artist.artist.name for track_artist in track.track_artists.all()],
+            duration_ms=int(track.duration.total_seconds() * 1000) if track.duration else None,
+            track_id=track.id,
+        )
+
+
+class TrackDownloader:
+    """
+    Searches YouTube for tracks and downloads the best matching audio. Meant
+    to be shared between threads, each running its own jobs.
+    """
+    def __init__(self, directory: Path, workers: int = 8, segments: int = 4, per_host: int = 4):
+        self.directory = directory
+        self.workers = workers
+        self.segments = segments
+        self.limiter = HostLimiter(per_host)
+        # Jobs for the same artist and title share a file:
+        self.path_locks: defaultdict[Path, threading.Lock] = defaultdict(threading.Lock)
+        self.path_locks_lock = threading.Lock()
+        self.downloaded_paths: set[Path] = set()
+        self.search_client = YoutubeWebClient()
+        self.metadata_client = YoutubeAndroidTestSuiteClient()
+
+    def get_best_metadata(self, video: YoutubeVideo) -> YoutubeVideo:
+        with self.limiter.limit(PLAYER_URL):
+            return dataclasses.replace(video, metadata=self.metadata_client.get_best_metadata(video.id))
+
+    def find_best_video(self, job: DownloadJob) -> tuple[YoutubeVideo, float] | None:
+        query = f"{job.artist_string} {job.title}".strip()
+        with self.limiter.limit(SEARCH_URL):
+            search_results = self.search_client.get_video_search_results(query)
+        # Metadata can only lower the score, so don't bother fetching it for
+        # videos that can't reach the threshold anyway:
+        videos = [
+            video for video in search_results
+            if video.get_name_score(job.title, job.artist_names) >= MATCH_THRESHOLD
+        ]
+        videos = [
+            video for video in iterate_concurrently(self.get_best_metadata, videos, self.workers)
+            if video.metadata is not None
+        ]
+        video_matches = sorted(
+            [(video, video.match(job.title, job.artist_names, job.duration_ms)) for video in videos],
+            key=lambda m: m[1],
+            reverse=True,
+        )
+        if video_matches and video_matches[0][1] >= MATCH_THRESHOLD:
+            return video_matches[0]
+        return None
+
+    def download(
+        self,
+        job: DownloadJob,
+        video: YoutubeVideo,
+        progress: Callable[[int, int | None], None] | None = None,
+    ) -> DownloadResult:
+        assert video.metadata is not None
+        path = self.directory / f"{sanitize_filename(str(job))}.{video.metadata.file_extension}"
+        with self.path_locks_lock:
+            path_lock = self.path_locks[path]
+        with path_lock:
+            if path in self.downloaded_paths:
+                return DownloadResult(path=path, size=path.stat().st_size, downloaded=0, seconds=0.0)
+            result = download_file(
+                video.metadata.url,
+                path,
+                segments=self.segments,
+                progress=progress,
+                limiter=self.limiter,
+            )
+            self.downloaded_paths.add(path)
+            return result
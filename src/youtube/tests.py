@@ -0,0 +1,34 @@
+import json
+import warnings
+
+from django.test import SimpleTestCase
+
+from youtube.clients import YoutubeWebClient, decode_js_string
+
+
+class DecodeJsStringTest(SimpleTestCase):
+    def test_escapes(self):
+        self.assertEqual(decode_js_string(r"Caf\xe9 é \u{1F3B5} 🎵"), "Café é 🎵 🎵")
+        self.assertEqual(decode_js_string(r"a\x22b\'c\\d\n\te\
+f"), "a\"b'c\\d\n\tef")
+
+    def test_non_ascii_is_kept(self):
+        self.assertEqual(decode_js_string(r"Björk – Jóga \x26 más"), "Björk – Jóga & más")
+
+
+class ExtractYtInitialDataTest(SimpleTestCase):
+    def test_string_literal_with_non_ascii_escapes(self):
+        body = (
+            r"<script>var ytInitialData = '\x7b\x22title\x22:\x22Caf\xe9 é 🎵 \\\x22x\\\x22\x22\x7d';"
+            "</script>"
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            data = YoutubeWebClient().extract_yt_initial_data(body)
+
+        assert data is not None
+        self.assertEqual(json.loads(data), {"title": 'Café é 🎵 "x"'})
+
+    def test_object_literal(self):
+        body = '<script>var ytInitialData = {"title": "Café"};</script>'
+        self.assertEqual(YoutubeWebClient().extract_yt_initial_data(body), '{"title": "Café"}')